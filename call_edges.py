@@ -0,0 +1,150 @@
+from bisect import bisect_right
+from collections import defaultdict
+from pathlib import PurePosixPath
+
+from loader import parse_node_id
+
+# row fields written by extraction: space-separated dotted call targets, and "local=qualified" import bindings
+CALL_COLS = ["call_targets", "call_imports"]
+
+def encode_calls(targets, imports):
+    """(call_targets, call_imports) row fields for a body; targets keep first-seen order, once each."""
+    return " ".join(dict.fromkeys(targets)), " ".join(f"{k}={v}" for k, v in imports.items())
+
+def module_of(file_path):
+    """"fastapi/openapi/utils.py" -> "fastapi.openapi.utils"; a package's __init__.py is the package."""
+    p = PurePosixPath(file_path)
+    parts = list(p.parent.parts) + ([] if p.stem == "__init__" else [p.stem])
+    return ".".join(part for part in parts if part not in ("", "."))
+
+def _absolute(name, file_path):
+    """Resolve a relative import (".routing.APIRouter") against the package of file_path."""
+    level = len(name) - len(name.lstrip("."))
+    if not level:
+        return name
+    package = module_of(file_path).split(".")
+    if PurePosixPath(file_path).stem != "__init__":
+        package = package[:-1]
+    base = package[:len(package) - (level - 1)] if level > 1 else package
+    rest = name[level:]
+    return ".".join(base + ([rest] if rest else []))
+
+class SymbolIndex:
+    """Where names are defined, from the file/symbol parts of node ids (and node labels).
+
+    resolve() maps one call target of one node to the ids it most likely calls:
+      1. a plain or self./cls. name defined in the caller's own file
+      2. a name the body imported, looked up in the imported module's file
+      3. a plain or self./cls. name's single definition anywhere
+      4. an attribute call on a known class (Foo.bar()): bar among Foo's methods
+    Everything else, ambiguous names and calls on other receivers (x.bar(), super().bar()), stays unresolved.
+    """
+
+    def __init__(self):
+        self.by_file_name = defaultdict(list)
+        self.by_name = defaultdict(list)
+        self.file_of_module = {}
+        # class name -> [(file, line)]; (file, method name) -> [(line, id)]; a method belongs
+        # to the nearest class above it in its file
+        self.classes = defaultdict(list)
+        self.methods = defaultdict(list)
+        self._class_lines = defaultdict(list)
+
+    def add(self, node_id, label="", kind=""):
+        """Index a node; kind is its type from the code file ("Class", "Method", ...), if known."""
+        parsed = parse_node_id(node_id)
+        if parsed is None:
+            return
+        file_path, symbol, line = parsed
+        for name in dict.fromkeys(n for n in (symbol, label) if n):
+            self.by_file_name[(file_path, name)].append(node_id)
+            self.by_name[name].append(node_id)
+        if kind == "Class":
+            self.classes[symbol].append((file_path, line))
+            self._class_lines[file_path].append(line)
+        elif kind == "Method":
+            self.methods[(file_path, symbol)].append((line, node_id))
+        self.file_of_module.setdefault(module_of(file_path), file_path)
+
+    def _methods(self, class_name, name):
+        found = []
+        for file_path, class_line in self.classes.get(class_name, ()):
+            lines = self._class_lines[file_path]
+            lines.sort()
+            for line, node_id in self.methods.get((file_path, name), ()):
+                k = bisect_right(lines, line) - 1
+                if k >= 0 and lines[k] == class_line:
+                    found.append(node_id)
+        return found
+
+    def _qualified(self, qualname, file_path):
+        # longest module prefix that is a known file, then the last part defined in it
+        parts = _absolute(qualname, file_path).split(".")
+        for k in range(len(parts) - 1, 0, -1):
+            target_file = self.file_of_module.get(".".join(parts[:k]))
+            if target_file is not None:
+                return list(self.by_file_name.get((target_file, parts[-1]), ()))
+        return []
+
+    def _unique(self, name):
+        found = self.by_name.get(name, ())
+        return list(found) if len(found) == 1 else []
+
+    def resolve(self, source_id, target, imports=None):
+        """Node ids the call target (a dotted name from extraction) of source_id resolves to."""
+        parsed = parse_node_id(source_id)
+        if parsed is None:
+            return []
+        file_path = parsed[0]
+        imports = imports or {}
+        parts = target.split(".")
+        name, head = parts[-1], parts[0]
+        if not name:
+            return []
+        if len(parts) == 1 or (len(parts) == 2 and head in ("self", "cls")):
+            local = list(self.by_file_name.get((file_path, name), ()))
+            if local:
+                return local
+            if len(parts) == 1 and name in imports:
+                found = self._qualified(imports[name], file_path)
+                if found:
+                    return found
+            return self._unique(name)
+        if head in imports:
+            return self._qualified(".".join([imports[head]] + parts[1:]), file_path)
+        # Foo.bar() on a known class; any other receiver (a dict, request.scope, super()) has an
+        # unknown type, and guessing from the name alone mostly links unrelated same-named methods
+        return self._methods(parts[-2], name)
+
+class CallSites:
+    """Call targets of extracted rows, held (without the rows) until every symbol is indexed.
+
+        sites = CallSites()
+        sites.add(rows)             # any number of batches
+        edges = sites.edges()       # [{"id", "source", "target", "label": "call"}, ...]
+    """
+
+    def __init__(self):
+        self.index = SymbolIndex()
+        self.ids = []
+        self._sites = []
+
+    def add(self, rows):
+        for r in rows:
+            node_id = r.get("id")
+            if node_id is None:
+                continue
+            self.ids.append(node_id)
+            self.index.add(node_id, r.get("label", ""), r.get("type", ""))
+            if r.get("call_targets"):
+                self._sites.append((node_id, r["call_targets"], r.get("call_imports", "")))
+
+    def edges(self):
+        """Resolved call edges in the shape of analysis.json graphEdges, one per (caller, callee, target)."""
+        out = []
+        for source, targets, imports in self._sites:
+            bound = dict(kv.split("=", 1) for kv in imports.split())
+            for target in targets.split():
+                out.extend({"id": f"{source}:calls:{callee}", "source": source, "target": callee, "label": "call"}
+                           for callee in self.index.resolve(source, target, bound))
+        return out
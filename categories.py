@@ -0,0 +1,124 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from graph_index import ANALYSIS, CATEGORY_KEYS, GraphIndex
+
+ROOT = Path(".")
+OUT_JSON = ROOT / "core" / "data" / "ranked_categories.json"
+
+# a node counts as trivial once its triviality outweighs its importance
+TRIVIAL_THRESHOLD = 0.5
+TOP_K = 5
+
+def membership(path=ANALYSIS, key="c1Output"):
+    """Long (category_id, category, parent_id, id) table of every group's nodeIds."""
+    gi = path if isinstance(path, GraphIndex) else GraphIndex.open(path)
+    groups = gi.categories(key)
+    sizes = [len(members) for _, members in groups]
+    positions = np.concatenate([members for _, members in groups]) if groups else np.zeros(0, dtype=np.int64)
+    ids = np.array(gi.ids(), dtype=object)
+    return pd.DataFrame({
+        "category_id": np.repeat([g.get("id") for g, _ in groups], sizes),
+        "category": np.repeat([g.get("label") or g.get("id") for g, _ in groups], sizes),
+        "parent_id": np.repeat([g.get("c1CategoryId") or "" for g, _ in groups], sizes),
+        "id": ids[positions] if len(ids) else np.array([], dtype=object),
+    })
+
+def category_rankings(scores, members, top_k=TOP_K):
+    """Join node scores to categories with one merge and one group-by.
+
+    Returns (summary, top): summary has one row per category (node counts, importance
+    mean/max/sum, trivial share), top the top_k nodes of each by importance.
+    """
+    cols = [c for c in ("id", "label", "importance", "triviality") if c in scores.columns]
+    scored = scores[cols].assign(id=scores["id"].astype(str)).drop_duplicates("id")
+    joined = members.merge(scored, on="id", how="left")
+    # NaN for unscored members, so the share is over scored nodes only
+    joined["trivial"] = (joined["triviality"] >= TRIVIAL_THRESHOLD).astype(float).where(joined["triviality"].notna())
+    keys = ["category_id", "category", "parent_id"]
+    summary = joined.groupby(keys, sort=False).agg(
+        n_nodes=("id", "size"),
+        n_scored=("importance", "count"),
+        importance_mean=("importance", "mean"),
+        importance_max=("importance", "max"),
+        importance_sum=("importance", "sum"),
+        trivial_share=("trivial", "mean"),
+    ).reset_index()
+    summary = summary.sort_values("importance_mean", ascending=False, kind="stable").reset_index(drop=True)
+    top = joined.dropna(subset=["importance"]).sort_values(
+        ["category_id", "importance"], ascending=[True, False], kind="stable")
+    top = top.groupby("category_id", sort=False).head(top_k)
+    top = top.assign(rank=top.groupby("category_id").cumcount() + 1)
+    return summary, top
+
+def _records(summary, top):
+    by_category = {cid: grp for cid, grp in top.groupby("category_id", sort=False)}
+    out = []
+    for row in summary.to_dict("records"):
+        grp = by_category.get(row["category_id"])
+        row = {k: (None if isinstance(v, float) and np.isnan(v) else v) for k, v in row.items()}
+        for c in ("importance_mean", "importance_sum", "trivial_share"):
+            if row[c] is not None:
+                row[c] = round(float(row[c]), 6)
+        if grp is None:
+            row["top"] = []
+        else:
+            # a blank label read back from the CSV is NaN, which json.dumps would write as a bare NaN
+            cols = grp[["rank", "id", "label", "importance"]].astype(object)
+            row["top"] = cols.where(cols.notna(), None).to_dict("records")
+        out.append(row)
+    return out
+
+def write_category_rankings(scores, path=ANALYSIS, out_path=OUT_JSON, top_k=TOP_K):
+    """Write per-category summaries and top nodes for every category level in the analysis file.
+
+    path is the analysis JSON or an open GraphIndex of it (as rank_func.py passes).
+    """
+    gi = path if isinstance(path, GraphIndex) else GraphIndex.open(path)
+    result = {}
+    for key in CATEGORY_KEYS:
+        members = membership(gi, key)
+        if members.empty:
+            continue
+        result[key] = _records(*category_rankings(scores, members, top_k))
+    if not result:
+        return None
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    source = gi.meta.get("source", str(path))
+    out_path.write_text(json.dumps({"source": source, "top_k": top_k, **result}, indent=2, allow_nan=False), encoding="utf-8")
+    return out_path
+
+def rankings_are_fresh(scores_csv, path=OUT_JSON):
+    """True if the category rankings exist and are at least as new as the scores CSV."""
+    path, scores_csv = Path(path), Path(scores_csv)
+    if not path.exists():
+        return False
+    return not scores_csv.exists() or path.stat().st_mtime >= scores_csv.stat().st_mtime
+
+def load_summaries(path=OUT_JSON, key="c1Output"):
+    """The summary table of one category level as a DataFrame (no node rows are read)."""
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    return pd.DataFrame([{k: v for k, v in r.items() if k != "top"} for r in data.get(key, [])])
+
+def main():
+    import argparse
+    from rollup import load_scores
+    parser = argparse.ArgumentParser(description="Rank nodes within each category of an analysis file")
+    parser.add_argument("--graph", default=str(ANALYSIS), help=f"Analysis JSON with c1Output/c2Subcategories (default {ANALYSIS})")
+    parser.add_argument("--top", type=int, default=TOP_K, help=f"Nodes kept per category (default {TOP_K})")
+    args = parser.parse_args()
+
+    path = write_category_rankings(load_scores(), args.graph, top_k=args.top)
+    if path is None:
+        print(f"[!] No category groups in {args.graph}")
+        return
+    print(f"[+] Written category rankings to: {path}")
+    summary = load_summaries(path)
+    print(summary[["category", "n_nodes", "importance_mean", "importance_max", "trivial_share"]].to_string(index=False))
+
+if __name__ == "__main__":
+    main()
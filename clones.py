@@ -0,0 +1,177 @@
+import zlib
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+# MinHash over k-shingles of a body's node-type sequence, bucketed by banded LSH.
+# With 8 bands of 4 rows, a pair shares a bucket with probability 1 - (1 - J^4)^8:
+# about 0.98 at Jaccard J = 0.8 and 0.08 at J = 0.4.
+NUM_PERM = 32
+BANDS = 8
+SHINGLE = 4
+# bodies with fewer distinct shingles are too small to call copies of each other
+MIN_SHINGLES = 8
+# estimated Jaccard a bucket member needs with the bucket's head signature to join its group
+THRESHOLD = 0.75
+
+SIG_COL = "clone_sig"
+CLONE_COLS = ["clone_group_size"]
+
+_MULT = np.uint64(0x9E3779B97F4A7C15)
+# fixed seeds: signatures are compared across processes and runs
+_rng = np.random.default_rng(0x5EED)
+_A = _rng.integers(1, 2**63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_B = _rng.integers(0, 2**63, NUM_PERM, dtype=np.uint64)
+_type_codes = {}
+
+def _code(token):
+    # crc32 rather than hash(): str hashes are salted per process
+    c = _type_codes.get(token)
+    if c is None:
+        c = _type_codes[token] = zlib.crc32(token.encode("utf-8"))
+    return c
+
+def shingles(shape, k=SHINGLE):
+    """Distinct 64-bit hashes of the k-grams of a token sequence (AST node types or lexical tokens)."""
+    codes = np.fromiter(map(_code, shape), dtype=np.uint64)
+    m = len(codes) - k + 1
+    if m <= 0:
+        return np.zeros(0, dtype=np.uint64)
+    h = np.zeros(m, dtype=np.uint64)
+    for j in range(k):
+        h = h * _MULT + codes[j:j + m]     # wraps mod 2^64
+    return np.unique(h)
+
+def clone_signature(shape):
+    """MinHash signature of shape's shingles as a hex string; "" for bodies below MIN_SHINGLES."""
+    x = shingles(shape)
+    if len(x) < MIN_SHINGLES:
+        return ""
+    # multiply-shift hashing, one row per permutation
+    h = (_A[:, None] * x[None, :] + _B[:, None]) >> np.uint64(32)
+    return h.min(axis=1).astype(">u4").tobytes().hex()
+
+class CloneIndex:
+    """Near-duplicate groups over MinHash signatures, appended in input order.
+
+        index = CloneIndex()
+        index.add(sigs)             # hex signatures from clone_signature ("" = none)
+        index.group_sizes()         # per position: size of its clone group (1 = unique)
+        index.clusters()            # [positions, ...] of every group of 2+, largest first
+
+    Grouping sorts each band's keys once and links every bucket member to one head
+    signature, so it is O(n log n) in the number of signatures, with no pairwise pass.
+    """
+
+    def __init__(self, bands=BANDS, threshold=THRESHOLD):
+        self.bands = bands
+        self.threshold = threshold
+        self._blocks = []
+        self._n = 0
+        self._labels = None
+
+    def __len__(self):
+        return self._n
+
+    def add(self, sigs):
+        sigs = list(sigs)
+        block = np.zeros((len(sigs), NUM_PERM), dtype=np.uint32)
+        valid = np.zeros(len(sigs), dtype=bool)
+        for i, s in enumerate(sigs):
+            if s:
+                block[i] = np.frombuffer(bytes.fromhex(s), dtype=">u4")
+                valid[i] = True
+        self._blocks.append((block, valid))
+        self._n += len(sigs)
+        self._labels = None
+
+    def labels(self):
+        """Clone group label per position; -1 for positions without a signature."""
+        if self._labels is not None:
+            return self._labels
+        labels = np.full(self._n, -1, dtype=np.int64)
+        idx = np.flatnonzero(np.concatenate([v for _, v in self._blocks])) if self._n else labels[:0]
+        n = len(idx)
+        # no signatures at all (e.g. only tiny bodies): nothing to group
+        if not n:
+            self._labels = labels
+            return labels
+        V = np.concatenate([b for b, _ in self._blocks])[idx].astype(np.uint64)
+        # whole-signature hash as tie-break: each bucket's head depends on its members, not input order
+        full = np.zeros(n, dtype=np.uint64)
+        for j in range(NUM_PERM):
+            full = full * _MULT + V[:, j]
+        src, dst = [], []
+        rows = NUM_PERM // self.bands
+        for b in range(self.bands):
+            key = np.zeros(n, dtype=np.uint64)
+            for j in range(b * rows, (b + 1) * rows):
+                key = key * _MULT + V[:, j]
+            order = np.lexsort((full, key))
+            k = key[order]
+            starts = np.r_[True, k[1:] != k[:-1]]
+            head = order[np.maximum.accumulate(np.where(starts, np.arange(n), 0))]
+            member = order[~starts]
+            head = head[~starts]
+            similar = (V[head] == V[member]).mean(axis=1) >= self.threshold
+            src.append(head[similar])
+            dst.append(member[similar])
+        src, dst = np.concatenate(src), np.concatenate(dst)
+        graph = sparse.coo_matrix((np.ones(len(src)), (src, dst)), shape=(n, n))
+        _, comp = connected_components(graph, directed=False)
+        labels[idx] = comp
+        self._labels = labels
+        return labels
+
+    def group_sizes(self):
+        """Per position, the number of positions in its clone group (1 without a signature)."""
+        labels = self.labels()
+        sizes = np.ones(self._n, dtype=np.int64)
+        has = labels >= 0
+        sizes[has] = np.bincount(labels[has])[labels[has]]
+        return sizes
+
+    def clusters(self, min_size=2):
+        """Position arrays of the clone groups with at least min_size members, largest first."""
+        labels = self.labels()
+        has = np.flatnonzero(labels >= 0)
+        order = has[np.argsort(labels[has], kind="stable")]
+        bounds = np.flatnonzero(np.diff(labels[order])) + 1
+        groups = [g for g in np.split(order, bounds) if len(g) >= min_size]
+        return sorted(groups, key=len, reverse=True)
+
+def main():
+    import argparse
+    import csv
+    from pathlib import Path
+    from loader import iter_batches, iter_json_items
+
+    ranked = Path("core") / "data" / "ranked_functions.json"
+    out_csv = Path("core") / "data" / "clone_clusters.csv"
+    parser = argparse.ArgumentParser(description="List near-duplicate clone groups of a ranked_functions.json")
+    parser.add_argument("--input", default=str(ranked), help=f"Output of rank_func.py (default {ranked})")
+    parser.add_argument("--min-size", type=int, default=2, help="Smallest group to list (default 2)")
+    parser.add_argument("--top", type=int, default=10, help="Groups to print (default 10)")
+    args = parser.parse_args()
+
+    ids, index = [], CloneIndex()
+    rows = ((r.get("id"), r.get(SIG_COL, "")) for r in iter_json_items(args.input, ("function_rankings",)))
+    for batch in iter_batches(rows, 10_000):
+        ids.extend(i for i, _ in batch)
+        index.add(s for _, s in batch)
+    groups = index.clusters(args.min_size)
+    with out_csv.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["cluster", "size", "id"])
+        for c, g in enumerate(groups):
+            writer.writerows((c, len(g), ids[k]) for k in g)
+    print(f"[+] {len(groups)} clone groups covering {sum(map(len, groups))} of {len(ids)} nodes")
+    print(f"[+] Written CSV to: {out_csv}")
+    for c, g in enumerate(groups[:args.top]):
+        print(f"== group {c} ({len(g)} nodes)")
+        for k in g:
+            print(f"  {ids[k]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import hashlib
+import json
+import re
+import sqlite3
+from pathlib import Path
+
+ROOT = Path(".")
+CACHE_DB = ROOT / "core" / "data" / "feature_cache.sqlite"
+
+# SQLite's default limit on bound parameters per statement is 999
+_BATCH = 500
+
+# blank lines before a body and any whitespace after it; indentation of the first line stays
+_BLANK_EDGES = re.compile(r"\A(?:[ \t\f]*\r?\n)+|\s+\Z")
+
+def code_digest(code):
+    return hashlib.sha1(code.encode("utf-8", "surrogatepass")).hexdigest()
+
+def body_digest(code):
+    """Digest of a body up to leading blank lines and trailing whitespace.
+
+    Those edges change no extracted feature (nonblank loc, AST, tokens, keyword hits),
+    so bodies with equal body_digest share one feature vector.
+    """
+    return code_digest(_BLANK_EDGES.sub("", code))
+
+class FeatureCache:
+    """Content-addressed on-disk store of per-node feature vectors with LRU eviction.
+
+    Entries are keyed by the extractor version plus a hash of the node's code (see
+    body_digest), so a version bump or any edit to a body simply misses and the
+    stale entry ages out.
+    """
+
+    def __init__(self, path=CACHE_DB, version="1", max_entries=500_000):
+        self.path = Path(path)
+        self.version = str(version)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS features (key TEXT PRIMARY KEY, vec TEXT NOT NULL, used INTEGER NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS features_used ON features (used)")
+        # one tick per run: everything touched in this run counts as most recently used
+        last = self.conn.execute("SELECT MAX(used) FROM features").fetchone()[0]
+        self.clock = (last or 0) + 1
+
+    def key(self, code):
+        return f"{self.version}:{body_digest(code)}"
+
+    def get_many(self, keys):
+        """Return {key: vector} for the cached keys and mark them as used."""
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        for start in range(0, len(unique), _BATCH):
+            batch = unique[start:start + _BATCH]
+            query = "SELECT key, vec FROM features WHERE key IN (%s)" % ",".join("?" * len(batch))
+            for k, vec in self.conn.execute(query, batch):
+                found[k] = json.loads(vec)
+        if found:
+            self.conn.executemany("UPDATE features SET used = ? WHERE key = ?", [(self.clock, k) for k in found])
+        n_hit = sum(1 for k in keys if k in found)
+        self.hits += n_hit
+        self.misses += len(keys) - n_hit
+        return found
+
+    def put_many(self, items):
+        """Store (key, vector) pairs, then evict least recently used entries over the bound."""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO features (key, vec, used) VALUES (?, ?, ?)",
+            [(k, json.dumps(vec), self.clock) for k, vec in items],
+        )
+        count = self.conn.execute("SELECT COUNT(*) FROM features").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM features WHERE key IN (SELECT key FROM features ORDER BY used LIMIT ?)", (excess,)
+            )
+            self.evicted += excess
+        self.conn.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        rate = (100.0 * self.hits / total) if total else 0.0
+        return f"{self.hits} hits, {self.misses} misses ({rate:.1f}% hit rate), {self.evicted} evicted"
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
@@ -0,0 +1,70 @@
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(".")
+STORE_DIR = ROOT / "core" / "data" / "ranked_functions_store"
+
+# string columns are dictionary-encoded: int32 codes plus a table of distinct values
+DICT_COLUMNS = ("id", "label")
+
+def write_store(rows, columns, path=STORE_DIR):
+    """Write rows as one typed .npy file per column under path (replacing any old store)."""
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    meta = {"rows": len(rows), "columns": []}
+    for c in columns:
+        values = [r.get(c) for r in rows]
+        if c in DICT_COLUMNS:
+            table = {}
+            codes = np.array([table.setdefault("" if v is None else str(v), len(table)) for v in values], dtype=np.int32)
+            np.save(tmp / f"{c}.codes.npy", codes)
+            np.save(tmp / f"{c}.values.npy", np.array(list(table), dtype=str))
+            meta["columns"].append({"name": c, "kind": "dict"})
+        else:
+            arr = np.array([0 if v is None else v for v in values])
+            if arr.dtype.kind not in "iufb":
+                arr = arr.astype(float)
+            np.save(tmp / f"{c}.npy", arr)
+            meta["columns"].append({"name": c, "kind": "num", "dtype": arr.dtype.str})
+    (tmp / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    shutil.rmtree(path, ignore_errors=True)
+    tmp.rename(path)
+    return path
+
+def read_columns(path=STORE_DIR):
+    """Memory-map a store; returns {name: array}, with dict columns as (codes, values)."""
+    path = Path(path)
+    meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+    cols = {}
+    for col in meta["columns"]:
+        c = col["name"]
+        if col["kind"] == "dict":
+            cols[c] = (np.load(path / f"{c}.codes.npy", mmap_mode="r"), np.load(path / f"{c}.values.npy"))
+        else:
+            cols[c] = np.load(path / f"{c}.npy", mmap_mode="r")
+    return cols
+
+def load_frame(path=STORE_DIR):
+    """Load a store as a pandas DataFrame; numeric columns stay backed by the mapped files."""
+    import pandas as pd
+    data = {}
+    for c, arr in read_columns(path).items():
+        if isinstance(arr, tuple):
+            codes, values = arr
+            data[c] = pd.Categorical.from_codes(np.asarray(codes), categories=values.astype(object))
+        else:
+            data[c] = arr
+    return pd.DataFrame(data, copy=False)
+
+def store_is_fresh(csv_path, path=STORE_DIR):
+    """True if the store exists and is at least as new as the CSV written alongside it."""
+    meta = Path(path) / "meta.json"
+    if not meta.exists():
+        return False
+    csv_path = Path(csv_path)
+    return not csv_path.exists() or meta.stat().st_mtime >= csv_path.stat().st_mtime
@@ -0,0 +1,299 @@
+import itertools
+import re
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+from graph_index import ANALYSIS, EDGE_TYPES, GraphIndex, collect_edges
+
+# edges PageRank follows: a node is important if important code calls or extends it
+RANK_EDGE_TYPES = ("calls", "extends")
+
+# per-node columns added to the ranked rows (all edge types for degree, calls on their own)
+GRAPH_COLS = ["in_degree", "out_degree", "call_in_degree", "call_out_degree", "pagerank"]
+
+class CallGraph:
+    """Node index plus one CSR adjacency matrix per edge type (row = source, column = target).
+
+    Duplicate edges add up, so entries are edge multiplicities.
+    """
+
+    def __init__(self, index, adjacency):
+        # index maps node id -> row/column, in insertion order
+        self.index = index
+        self.ids = list(index)
+        self.adj = adjacency
+
+    @classmethod
+    def from_edges(cls, edges, ids=()):
+        """Build from an iterable of edge dicts; nodes seen only in edges are appended to ids."""
+        index, pairs = collect_edges(edges, ids)
+        n = len(index)
+        adjacency = {}
+        for kind, (rows, cols) in pairs.items():
+            data = np.ones(len(rows), dtype=np.float64)
+            adjacency[kind] = sparse.csr_matrix((data, (rows, cols)), shape=(n, n))
+        return cls(index, adjacency)
+
+    @classmethod
+    def from_index(cls, gi):
+        """Wrap a GraphIndex sidecar; the CSR arrays come straight from the mapped files."""
+        n = len(gi)
+        index = dict(zip(gi.ids(), itertools.count()))
+        adjacency = {kind: sparse.csr_matrix(gi.csr(kind), shape=(n, n)) for kind in gi.edge_types}
+        return cls(index, adjacency)
+
+    @classmethod
+    def load(cls, path=ANALYSIS):
+        """The graph of an analysis file, via its sidecar index (built on first use)."""
+        return cls.from_index(GraphIndex.open(path))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def matrix(self, kinds=EDGE_TYPES):
+        """Sum of the adjacency matrices of the given edge types."""
+        total = sparse.csr_matrix((len(self), len(self)), dtype=np.float64)
+        for kind in kinds:
+            if kind in self.adj:
+                total = total + self.adj[kind]
+        return total
+
+    def degrees(self, kinds=EDGE_TYPES):
+        """(in_degree, out_degree) arrays over the given edge types."""
+        A = self.matrix(kinds)
+        return np.asarray(A.sum(axis=0)).ravel(), np.asarray(A.sum(axis=1)).ravel()
+
+    def _transition(self, kinds):
+        """(W, dangling) for a random walk on kinds: W[j, i] = weight(i -> j) / out-weight(i)."""
+        A = self.matrix(kinds)
+        out = np.asarray(A.sum(axis=1)).ravel()
+        dangling = out == 0
+        inv_out = np.divide(1.0, out, out=np.zeros(len(self)), where=~dangling)
+        return (A.T @ sparse.diags(inv_out)).tocsr(), dangling
+
+    def pagerank(self, kinds=RANK_EDGE_TYPES, damping=0.85, tol=1e-10, max_iter=200):
+        """PageRank by sparse power iteration; dangling nodes spread their rank uniformly."""
+        n = len(self)
+        if n == 0:
+            return np.zeros(0)
+        W, dangling = self._transition(kinds)
+        r = np.full(n, 1.0 / n)
+        for _ in range(max_iter):
+            nxt = damping * (W @ r) + (damping * r[dangling].sum() + 1.0 - damping) / n
+            done = np.abs(nxt - r).sum() < tol
+            r = nxt
+            if done:
+                break
+        return r
+
+    def personalized_pagerank(self, seeds, kinds=("calls",), damping=0.85, tol=1e-10, max_iter=200):
+        """Personalized PageRank for many seed sets at once; returns an (n_nodes, n_seeds) matrix.
+
+        seeds is a list of node-id collections (a bare id is a one-node set). All columns
+        advance together through one sparse x dense product per iteration, so k seeds
+        cost about one walk with k-wide rows instead of k separate runs. Teleports and
+        dangling nodes return to the column's own seeds; ids missing from the graph are
+        ignored, and a seed set with none left gives a zero column.
+        """
+        n, k = len(self), len(seeds)
+        S = np.zeros((n, k))
+        for j, group in enumerate(seeds):
+            rows = [self.index[i] for i in ([group] if isinstance(group, str) else group) if i in self.index]
+            if rows:
+                np.add.at(S[:, j], rows, 1.0 / len(rows))
+        if n == 0 or k == 0:
+            return S
+        W, dangling = self._transition(kinds)
+        dangling = dangling.astype(S.dtype)
+        R = S.copy()
+        for _ in range(max_iter):
+            # dangling mass per column is one dense vector-matrix product, not a masked copy
+            nxt = damping * (W @ R) + (damping * (dangling @ R) + 1.0 - damping) * S
+            done = np.abs(nxt - R).sum(axis=0).max() < tol
+            R = nxt
+            if done:
+                break
+        return R
+
+    def containment(self):
+        """(parent, depth) per node from the contains edges; parent is -1 at the roots."""
+        n = len(self)
+        coo = self.adj["contains"].tocoo() if "contains" in self.adj else sparse.coo_matrix((n, n))
+        parent = np.full(n, -1, dtype=np.int64)
+        parent[coo.col[::-1]] = coo.row[::-1]   # an id with several containers keeps the first
+        depth = np.zeros(n, dtype=np.int64)
+        for _ in range(n + 1):
+            nxt = np.where(parent >= 0, depth[parent] + 1, 0)
+            if np.array_equal(nxt, depth):
+                return parent, depth
+            depth = nxt
+        raise ValueError("contains edges form a cycle")
+
+    def rollup(self, values, weights=None):
+        """Aggregate per-node values over every containment subtree, deepest level first.
+
+        values holds NaN for nodes that should not count (e.g. folder and file nodes
+        themselves); a node's own value is part of its subtree. Each level is folded
+        into its parents with one sparse product (plus a scatter-max), so the whole
+        pass touches every node once. Returns {"count", "sum", "max", "mean",
+        "weighted"} arrays, "weighted" being the mean weighted by weights.
+        """
+        n = len(self)
+        parent, depth = self.containment()
+        values = np.asarray(values, dtype=np.float64)
+        has = ~np.isnan(values)
+        v = np.where(has, values, 0.0)
+        w = np.where(has, 1.0 if weights is None else np.asarray(weights, dtype=np.float64), 0.0)
+        # columns: count, sum, weighted sum, weight total
+        S = np.column_stack([has.astype(np.float64), v, v * w, w])
+        mx = np.where(has, v, -np.inf)
+        order = np.argsort(-depth, kind="stable")
+        bounds = np.flatnonzero(np.diff(depth[order])) + 1
+        for level in np.split(order, bounds):
+            level = level[parent[level] >= 0]
+            if not len(level):
+                continue
+            P = sparse.csr_matrix((np.ones(len(level)), (parent[level], level)), shape=(n, n))
+            S += P @ S
+            np.maximum.at(mx, parent[level], mx[level])
+        count, total, wsum, wtot = S.T
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return {
+                "count": count,
+                "sum": total,
+                "max": np.where(count > 0, mx, np.nan),
+                "mean": np.where(count > 0, total / count, np.nan),
+                "weighted": np.where(wtot > 0, wsum / wtot, np.nan),
+            }
+
+    def features(self):
+        """{column: array aligned with self.ids} for GRAPH_COLS."""
+        in_deg, out_deg = self.degrees()
+        call_in, call_out = self.degrees(("calls",))
+        return {
+            "in_degree": in_deg,
+            "out_degree": out_deg,
+            "call_in_degree": call_in,
+            "call_out_degree": call_out,
+            "pagerank": self.pagerank(),
+        }
+
+def category_seeds(path=ANALYSIS, key="c1Output"):
+    """{category label: node ids} for the c1Output (or c2Subcategories) groups of an analysis file.
+
+    path may also be an open GraphIndex; groups come from its snapshot either way.
+    A label shared by several groups gets each group's id appended, "label (id)", so
+    every group keeps its own seed set.
+    """
+    gi = path if isinstance(path, GraphIndex) else GraphIndex.open(path)
+    groups = [(g.get("label") or g.get("id"), g.get("id"), [gi.node_id(k) for k in members])
+              for g, members in gi.categories(key)]
+    repeated = Counter(name for name, _, _ in groups)
+    return {(f"{name} ({gid})" if repeated[name] > 1 else name): members for name, gid, members in groups}
+
+def seed_column(name, prefix="ppr_"):
+    """Feature column name for a seed set, e.g. "Security & Auth" -> "ppr_security_auth"."""
+    return prefix + "_".join(re.findall(r"[a-z0-9]+", str(name).lower()))
+
+class SeedRelevance:
+    """Node x seed relevance (personalized PageRank), addressable by node id and seed name.
+
+        rel = SeedRelevance(graph, {"asgi": ["code:fastapi/applications.py:__call__:1129"]})
+        rel.top("asgi", 10)     # [(node id, relevance), ...] most relevant first
+        rel.of(node_id)         # {seed name: relevance}
+    """
+
+    def __init__(self, graph, seeds, **kwargs):
+        self.ids = graph.ids
+        self.index = graph.index
+        self.names = list(seeds)
+        self.matrix = graph.personalized_pagerank([seeds[s] for s in self.names], **kwargs)
+
+    def top(self, name, k=10):
+        col = self.matrix[:, self.names.index(name)]
+        order = np.argsort(-col, kind="stable")[:k]
+        return [(self.ids[i], float(col[i])) for i in order if col[i] > 0]
+
+    def of(self, node_id):
+        k = self.index.get(node_id)
+        return {s: (float(self.matrix[k, j]) if k is not None else 0.0) for j, s in enumerate(self.names)}
+
+    def columns(self):
+        """{feature column: array aligned with the graph's ids}, one column per seed set.
+
+        Names that reduce to the same column ("A & B", "A B") get _2, _3, ... suffixes.
+        """
+        out = {}
+        for j, s in enumerate(self.names):
+            col = base = seed_column(s)
+            for k in itertools.count(2):
+                if col not in out:
+                    break
+                col = f"{base}_{k}"
+            out[col] = self.matrix[:, j]
+        return out
+
+class GraphFeatures:
+    """Per-node feature lookup for the ranker; nodes outside the graph get zeros.
+
+    Columns are GRAPH_COLS plus, given seed sets, one personalized PageRank column each.
+    """
+
+    def __init__(self, graph, seeds=None):
+        self.index = graph.index
+        cols = graph.features()
+        if seeds:
+            cols.update(SeedRelevance(graph, seeds).columns())
+        # plain Python numbers, so rows serialize to JSON like every other feature
+        self.columns = {c: v.tolist() for c, v in cols.items()}
+
+    @classmethod
+    def load(cls, path=ANALYSIS, seed_groups=None):
+        """seed_groups names an analysis key ("c1Output", "c2Subcategories") whose groups seed PPR."""
+        return cls.from_index(GraphIndex.open(path), seed_groups)
+
+    @classmethod
+    def from_index(cls, gi, seed_groups=None):
+        seeds = category_seeds(gi, seed_groups) if seed_groups else None
+        return cls(CallGraph.from_index(gi), seeds)
+
+    @classmethod
+    def from_edges(cls, edges, ids=()):
+        """Features of an edge list alone, e.g. call edges synthesized from code (no category seeds)."""
+        return cls(CallGraph.from_edges(edges, ids))
+
+    @property
+    def names(self):
+        return list(self.columns)
+
+    def annotate(self, rows):
+        for r in rows:
+            k = self.index.get(r.get("id"))
+            for c, values in self.columns.items():
+                r[c] = values[k] if k is not None else 0.0
+        return rows
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Rank nodes by relevance to entry-point seeds (personalized PageRank)")
+    parser.add_argument("--graph", default=str(ANALYSIS), help=f"Analysis JSON with graphEdges (default {ANALYSIS})")
+    parser.add_argument("--seed", action="append", default=[], help="Entry-point node id; repeat for several seeds")
+    parser.add_argument("--seed-groups", choices=["c1Output", "c2Subcategories"], help="Use every category as a seed set")
+    parser.add_argument("--top", type=int, default=10, help="Nodes to show per seed (default 10)")
+    args = parser.parse_args()
+
+    seeds = {s: [s] for s in args.seed}
+    if args.seed_groups:
+        seeds.update(category_seeds(args.graph, args.seed_groups))
+    if not seeds:
+        parser.error("give --seed and/or --seed-groups")
+    rel = SeedRelevance(CallGraph.load(args.graph), seeds)
+    for name in rel.names:
+        print(f"== {name}")
+        for node_id, score in rel.top(name, args.top):
+            print(f"  {score:.4f}  {node_id}")
+
+if __name__ == "__main__":
+    main()
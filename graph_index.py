@@ -0,0 +1,498 @@
+import itertools
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+from loader import ANALYSIS_WITH_CODE, iter_json_arrays, iter_json_items, parse_node_id
+
+ROOT = Path(".")
+ANALYSIS = ROOT / "core" / "data" / "analysis.json"
+
+EDGE_TYPES = ("contains", "calls", "extends")
+DIRECTIONS = ("out", "in")
+# analysisData keys holding node groups ({"id", "label", ..., "nodeIds": [...]})
+CATEGORY_KEYS = ("c1Output", "c2Subcategories")
+
+_LABEL_TYPES = {"call": "calls", "extends": "extends"}
+
+# bump when the snapshot layout changes, so older snapshots are rebuilt rather than misread
+SNAPSHOT_FORMAT = 2
+# code-file rows with exactly these keys, in this order, are held in columns alone; any other
+# row (extra fields, non-string values, not a dict at all) also keeps its JSON in rows.extra
+_PLAIN_KEYS = ["id", "label", "code", "type"]
+
+def edge_type(edge):
+    """contains / calls / extends, from the label ("call@993", "extends@12", None) or the id."""
+    label = edge.get("label")
+    if label:
+        kind = label.split("@", 1)[0]
+        return _LABEL_TYPES.get(kind, kind)
+    # ids read "<source>:<type>:<target>"; an unlabeled edge is a containment one
+    edge_id = edge.get("id") or ""
+    for kind in EDGE_TYPES:
+        if f":{kind}:" in edge_id:
+            return kind
+    return "contains"
+
+class _EdgeBuffer:
+    """Edge endpoints and kinds buffered as strings, interned into positions once every id is known."""
+
+    def __init__(self):
+        self.src, self.dst, self.kinds = [], [], []
+        self._kind_of_label = {}    # labels repeat ("call@993"), so classify each distinct one once
+
+    def add(self, e):
+        s, d = e.get("source"), e.get("target")
+        if s is None or d is None:
+            return
+        label = e.get("label")
+        if label:
+            kind = self._kind_of_label.get(label)
+            if kind is None:
+                kind = self._kind_of_label[label] = edge_type(e)
+        else:
+            kind = edge_type(e)
+        self.src.append(s)
+        self.dst.append(d)
+        self.kinds.append(kind)
+
+    def intern(self, ids=()):
+        """({node id: k} with ids first, then nodes seen only in edges; {kind: (sources, targets)})."""
+        src, dst, kinds = self.src, self.dst, self.kinds
+        # dict.fromkeys/map keep the per-node work in C, which matters at millions of edges
+        index = dict(zip(dict.fromkeys(itertools.chain(ids, src, dst)), itertools.count()))
+        rows = np.fromiter(map(index.__getitem__, src), dtype=np.int64, count=len(src))
+        cols = np.fromiter(map(index.__getitem__, dst), dtype=np.int64, count=len(dst))
+        codes = {kind: k for k, kind in enumerate(dict.fromkeys(itertools.chain(EDGE_TYPES, kinds)))}
+        kind_codes = np.fromiter(map(codes.__getitem__, kinds), dtype=np.int64, count=len(kinds))
+        pairs = {}
+        for kind, k in codes.items():
+            sel = kind_codes == k
+            pairs[kind] = (rows[sel], cols[sel])
+        return index, pairs
+
+def collect_edges(edges, ids=()):
+    """Intern an edge stream: ({node id: k} in first-seen order, {kind: (sources, targets)}).
+
+    ids come first, so they keep their positions; nodes seen only in edges follow.
+    """
+    buffer = _EdgeBuffer()
+    for e in edges:
+        buffer.add(e)
+    return buffer.intern(ids)
+
+def to_csr(rows, cols, n):
+    """(indptr, indices, weight) with duplicate edges summed into the weight."""
+    flat, weight = np.unique(rows * n + cols, return_counts=True)
+    r, c = np.divmod(flat, max(n, 1))
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(r, minlength=n), out=indptr[1:])
+    return indptr, c, weight.astype(np.float64)
+
+def index_path(json_path=ANALYSIS):
+    """Sidecar directory next to the analysis file, e.g. core/data/analysis.graph/."""
+    return Path(json_path).with_suffix(".graph")
+
+def _source_stamp(json_path, prefix="source"):
+    st = Path(json_path).stat()
+    return {prefix: str(json_path), f"{prefix}_mtime": st.st_mtime, f"{prefix}_size": st.st_size}
+
+def _code_stamp(code_path):
+    if code_path is None or not Path(code_path).exists():
+        return {"code_source": None}
+    return _source_stamp(code_path, "code_source")
+
+def index_is_fresh(json_path=ANALYSIS, path=None, code_path=ANALYSIS_WITH_CODE):
+    """True if the sidecar was built from json_path and code_path as they are now."""
+    meta = (Path(path) if path else index_path(json_path)) / "meta.json"
+    if not meta.exists():
+        return False
+    stamp = json.loads(meta.read_text(encoding="utf-8"))
+    want = dict(_source_stamp(json_path), **_code_stamp(code_path), format=SNAPSHOT_FORMAT)
+    return all(stamp.get(k) == v for k, v in want.items() if k != "source")
+
+class _ColumnWriter:
+    """A 1-D .npy file filled by appending, so a column never has to fit in memory.
+
+    The header is a fixed-size placeholder until close() patches in the final length.
+    """
+
+    HEADER = 128
+
+    def __init__(self, path, dtype, chunk=1 << 16):
+        self.dtype = np.dtype(dtype)
+        self.n = 0
+        self._buf = []
+        self._chunk = chunk
+        self._f = open(path, "wb")
+        self._f.write(b"\0" * self.HEADER)
+
+    def append(self, value):
+        self._buf.append(value)
+        if len(self._buf) >= self._chunk:
+            self._flush()
+
+    def write(self, data):
+        """Append raw bytes (uint8 columns only)."""
+        self._f.write(data)
+        self.n += len(data)
+
+    def _flush(self):
+        if self._buf:
+            self._f.write(np.array(self._buf, dtype=self.dtype).tobytes())
+            self.n += len(self._buf)
+            self._buf = []
+
+    def close(self):
+        self._flush()
+        header = "{'descr': %r, 'fortran_order': False, 'shape': (%d,), }" % (
+            np.lib.format.dtype_to_descr(self.dtype), self.n)
+        self._f.seek(0)
+        self._f.write(b"\x93NUMPY\x01\x00" + (self.HEADER - 10).to_bytes(2, "little")
+                      + header.ljust(self.HEADER - 11).encode("latin1") + b"\n")
+        self._f.close()
+
+class _TextWriter:
+    """A text column written one value at a time: one UTF-8 blob plus n+1 offsets,
+    so value k is blob[offsets[k]:offsets[k+1]]."""
+
+    def __init__(self, tmp, name):
+        self._blob = _ColumnWriter(tmp / f"{name}.blob.npy", np.uint8)
+        self._offsets = _ColumnWriter(tmp / f"{name}.offsets.npy", np.int64)
+        self._offsets.append(0)
+        self._end = 0
+
+    def append(self, text):
+        data = text.encode("utf-8")
+        self._blob.write(data)
+        self._end += len(data)
+        self._offsets.append(self._end)
+
+    def close(self):
+        self._blob.close()
+        self._offsets.close()
+
+class _DictWriter:
+    """The codes + values pair of _save_dict_column, written one value at a time."""
+
+    def __init__(self, tmp, name):
+        self._path = tmp / f"{name}.values.npy"
+        self._codes = _ColumnWriter(tmp / f"{name}.codes.npy", np.int32)
+        self._table = {}
+
+    def append(self, value):
+        self._codes.append(self._table.setdefault(value, len(self._table)))
+
+    def close(self):
+        self._codes.close()
+        np.save(self._path, np.array(list(self._table), dtype=str))
+
+def _save_dict_column(tmp, name, values):
+    # repeated strings are dictionary-encoded, as in feature_store
+    table = {}
+    codes = np.array([table.setdefault(v, len(table)) for v in values], dtype=np.int32)
+    np.save(tmp / f"{name}.codes.npy", codes)
+    np.save(tmp / f"{name}.values.npy", np.array(list(table), dtype=str))
+
+def _text(value):
+    # labels and types as build_row reads them: falsy -> "", anything else as a string
+    return "" if not value else value if isinstance(value, str) else str(value)
+
+def _extra(node):
+    """"" for a plain row (see _PLAIN_KEYS); otherwise the row as JSON, minus code text kept in rows.code.
+
+    A row that is not a dict is wrapped in a list, so nodes() can tell it apart.
+    """
+    if not isinstance(node, dict):
+        return json.dumps([node])
+    code = node.get("code")
+    if (list(node) == _PLAIN_KEYS and isinstance(node["id"], str) and isinstance(node["label"], str)
+            and isinstance(node["type"], str) and (code is None or isinstance(code, str))):
+        return ""
+    return json.dumps(dict(node, code=None) if isinstance(code, str) else node)
+
+def build_index(json_path=ANALYSIS, path=None, code_path=ANALYSIS_WITH_CODE):
+    """Parse the analysis file (and its code file) once; write the graph as memory-mappable .npy columns.
+
+    code_path is the analysis-with-code.json whose nodes carry type and code; when it
+    exists its nodes are joined in by id, so the snapshot holds code, type, edges and
+    categories together. The code file's nodes are also kept as rows in file order
+    (repeated ids included, with every field they carry), which nodes() replays.
+    Each JSON file is streamed once (analysis.json's nodes, edges and categories in a
+    single scan), and code rows go straight to their column files: memory grows with
+    the number of nodes and edges, not with the size of their code.
+    """
+    json_path = Path(json_path)
+    path = Path(path) if path else index_path(json_path)
+    tmp = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    # one scan of analysis.json: it carries no code, so of its nodes only the first label per
+    # id is kept; edges are buffered as strings and interned once the code file adds its ids
+    graph_labels, groups, edges = {}, {key: [] for key in CATEGORY_KEYS}, _EdgeBuffer()
+    arrays = iter_json_arrays(json_path, ("analysisData",), ("graphNodes", "graphEdges") + CATEGORY_KEYS)
+    for key, item in arrays:
+        if key == "graphEdges":
+            edges.add(item)
+        elif key == "graphNodes":
+            if isinstance(item, dict) and isinstance(item.get("id"), str):
+                graph_labels.setdefault(item["id"], _text(item.get("label")))
+        else:
+            groups[key].append(item)
+    # the code file's rows: label, type, code, anything else; ids place rows once the node index exists
+    has_code_file = code_path is not None and Path(code_path).exists()
+    row_ids, row_of = [], {}
+    writers = [_TextWriter(tmp, "rows.label"), _DictWriter(tmp, "rows.type"), _TextWriter(tmp, "rows.code"),
+               _ColumnWriter(tmp / "rows.code_present.npy", bool), _TextWriter(tmp, "rows.extra")]
+    row_label, row_type, row_code, row_present, row_extra = writers
+    code_rows = iter_json_items(code_path, ("analysisData", "graphNodes")) if has_code_file else ()
+    for node in code_rows:
+        fields = node if isinstance(node, dict) else {}
+        node_id = fields.get("id") if isinstance(fields.get("id"), str) else None
+        row_of.setdefault(node_id, len(row_ids))
+        row_ids.append(node_id)
+        code = fields.get("code")
+        row_label.append(_text(fields.get("label")))
+        row_type.append(_text(fields.get("type")))
+        row_code.append(code if isinstance(code, str) else "")
+        row_present.append(isinstance(code, str))
+        row_extra.append(_extra(node))
+    for w in writers:
+        w.close()
+    row_of.pop(None, None)
+    n_rows = len(row_ids)
+
+    index, pairs = edges.intern(ids=itertools.chain(graph_labels, row_of))
+    del edges
+    ids = list(index)
+    n = len(ids)
+    # ids: one newline-joined UTF-8 blob plus start offsets, so id k is a slice and all ids one decode
+    encoded = [i.encode("utf-8") for i in ids]
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum([len(b) + 1 for b in encoded], out=offsets[1:])
+    np.save(tmp / "ids.blob.npy", np.frombuffer(b"\n".join(encoded), dtype=np.uint8))
+    np.save(tmp / "ids.offsets.npy", offsets)
+    np.save(tmp / "ids.order.npy", np.array(sorted(range(n), key=ids.__getitem__), dtype=np.int64))
+
+    parsed = [parse_node_id(i) or ("", "", -1) for i in ids]
+    _save_dict_column(tmp, "file", [p[0] for p in parsed])
+    _save_dict_column(tmp, "symbol", [p[1] for p in parsed])
+    np.save(tmp / "line.npy", np.array([p[2] for p in parsed], dtype=np.int64))
+
+    # per node: its first code row and label (the code file wins where both files give one)
+    first_row = np.array([row_of.get(i, -1) for i in ids], dtype=np.int64)
+    np.save(tmp / "row_of.npy", first_row)
+    np.save(tmp / "rows.position.npy", np.fromiter((index.get(i, -1) for i in row_ids), dtype=np.int64, count=n_rows))
+    blob = memoryview(np.load(tmp / "rows.label.blob.npy", mmap_mode="r"))
+    at = np.load(tmp / "rows.label.offsets.npy", mmap_mode="r")
+    labels = _TextWriter(tmp, "label")
+    for i, r in zip(ids, first_row.tolist()):
+        labels.append(str(blob[at[r]:at[r + 1]], "utf-8") if r >= 0 else graph_labels.get(i, ""))
+    labels.close()
+    del blob, at, row_ids, row_of, graph_labels
+
+    # categories: group metadata in meta.json, members as CSR rows of node positions
+    categories = {}
+    for key, key_groups in groups.items():
+        members = [[index[i] for i in (g.get("nodeIds") or []) if i in index] for g in key_groups]
+        indptr = np.zeros(len(members) + 1, dtype=np.int64)
+        np.cumsum([len(m) for m in members], out=indptr[1:])
+        np.save(tmp / f"{key}.indptr.npy", indptr)
+        np.save(tmp / f"{key}.indices.npy", np.array([k for m in members for k in m], dtype=np.int64))
+        categories[key] = [{k: v for k, v in g.items() if k != "nodeIds"} for g in key_groups]
+
+    for kind, (rows, cols) in pairs.items():
+        for direction, (a, b) in zip(DIRECTIONS, ((rows, cols), (cols, rows))):
+            indptr, indices, weight = to_csr(a, b, n)
+            np.save(tmp / f"{kind}.{direction}.indptr.npy", indptr)
+            np.save(tmp / f"{kind}.{direction}.indices.npy", indices)
+            np.save(tmp / f"{kind}.{direction}.weight.npy", weight)
+            np.save(tmp / f"{kind}.{direction}.degree.npy", np.bincount(a, minlength=n).astype(np.float64))
+
+    meta = dict(_source_stamp(json_path), **_code_stamp(code_path if has_code_file else None),
+                format=SNAPSHOT_FORMAT, nodes=n, code_rows=n_rows, edge_types=list(pairs), categories=categories)
+    (tmp / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    shutil.rmtree(path, ignore_errors=True)
+    tmp.rename(path)
+    return path
+
+class GraphIndex:
+    """Memory-mapped graph snapshot written by build_index.
+
+    Nodes are integers 0..n-1. Neighbour, degree, file/symbol/line, label/type/code and
+    id lookups by position are O(1) slices of the mapped arrays; finding a node by its
+    id string is a binary search over the sorted order, O(log n). Nothing is parsed
+    from JSON.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.meta = json.loads((self.path / "meta.json").read_text(encoding="utf-8"))
+        self.edge_types = tuple(self.meta["edge_types"])
+        load = lambda name: np.load(self.path / f"{name}.npy", mmap_mode="r")
+        self._blob = load("ids.blob")
+        self._offsets = load("ids.offsets")
+        self._order = load("ids.order")
+        self._file_codes, self._files = load("file.codes"), np.load(self.path / "file.values.npy")
+        self._symbol_codes, self._symbols = load("symbol.codes"), np.load(self.path / "symbol.values.npy")
+        self._line = load("line")
+        self._label_blob, self._label_offsets = load("label.blob"), load("label.offsets")
+        self._row_of = load("row_of")
+        self._row_position = load("rows.position")
+        self._row_label_blob, self._row_label_offsets = load("rows.label.blob"), load("rows.label.offsets")
+        self._type_codes, self._types = load("rows.type.codes"), np.load(self.path / "rows.type.values.npy")
+        self._code_blob, self._code_offsets = load("rows.code.blob"), load("rows.code.offsets")
+        self._code_present = load("rows.code_present")
+        self._extra_blob, self._extra_offsets = load("rows.extra.blob"), load("rows.extra.offsets")
+        self._categories = self.meta.get("categories", {})
+        self._members = {key: (load(f"{key}.indptr"), load(f"{key}.indices")) for key in self._categories}
+        self._csr = {(kind, d): tuple(load(f"{kind}.{d}.{part}") for part in ("indptr", "indices", "weight"))
+                     for kind in self.edge_types for d in DIRECTIONS}
+        self._degree = {(kind, d): load(f"{kind}.{d}.degree") for kind in self.edge_types for d in DIRECTIONS}
+
+    @classmethod
+    def open(cls, json_path=ANALYSIS, path=None, code_path=ANALYSIS_WITH_CODE):
+        """Open the snapshot for json_path (+ code_path), (re)building it first if missing or stale."""
+        path = Path(path) if path else index_path(json_path)
+        if not index_is_fresh(json_path, path, code_path):
+            build_index(json_path, path, code_path)
+        return cls(path)
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def node_id(self, k):
+        return self._blob[self._offsets[k]:self._offsets[k + 1] - 1].tobytes().decode("utf-8")
+
+    def ids(self):
+        """Every node id in index order (a single decode of the blob)."""
+        return self._blob.tobytes().decode("utf-8").split("\n") if len(self) else []
+
+    def lookup(self, node_id):
+        """Position of node_id, or None."""
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.node_id(self._order[mid]) < node_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self) and self.node_id(self._order[lo]) == node_id:
+            return int(self._order[lo])
+        return None
+
+    def file(self, k):
+        return str(self._files[self._file_codes[k]])
+
+    def symbol(self, k):
+        return str(self._symbols[self._symbol_codes[k]])
+
+    def line(self, k):
+        return int(self._line[k])
+
+    def label(self, k):
+        return self._label_blob[self._label_offsets[k]:self._label_offsets[k + 1]].tobytes().decode("utf-8")
+
+    def type(self, k):
+        """Node type from the code file ("Function", "Class", ...), "" if it has no code row."""
+        r = self._row_of[k]
+        return str(self._types[self._type_codes[r]]) if r >= 0 else ""
+
+    def code(self, k):
+        """Source of node k, or None if the code file gave it none (folders, files)."""
+        r = self._row_of[k]
+        return self.row_code(r) if r >= 0 else None
+
+    def row_code(self, r):
+        """Source of code-file row r, decoded from its byte range in the mapped blob (None unless a string)."""
+        if not self._code_present[r]:
+            return None
+        return self._code_blob[self._code_offsets[r]:self._code_offsets[r + 1]].tobytes().decode("utf-8")
+
+    @property
+    def has_code(self):
+        return self.meta.get("code_source") is not None
+
+    def nodes(self, lazy=False):
+        """The code file's graphNodes rebuilt from the snapshot, in their original order.
+
+        Yields the same values as iter_graph_nodes (every field, non-dict entries
+        included), so callers can switch without change; code is decoded one node at
+        a time. With lazy=True code is not decoded at all: nodes that have some carry
+        "code": None plus "_code_row", the row to hand to row_code() when it is needed.
+        """
+        # offsets as Python ints and the blobs as memoryviews keep the per-node cost to a few slices
+        ids, ids_at = memoryview(self._blob), self._offsets.tolist()
+        labels, label_at = memoryview(self._row_label_blob), self._row_label_offsets.tolist()
+        code, code_at = memoryview(self._code_blob), self._code_offsets.tolist()
+        present = self._code_present.tolist()
+        extra, extra_at = memoryview(self._extra_blob), self._extra_offsets.tolist()
+        types = [str(t) for t in self._types]
+        type_codes = self._type_codes.tolist()
+        for r, k in enumerate(self._row_position.tolist()):
+            if extra_at[r] != extra_at[r + 1]:
+                node = json.loads(str(extra[extra_at[r]:extra_at[r + 1]], "utf-8"))
+                if isinstance(node, list):
+                    yield node[0]
+                    continue
+                if present[r]:
+                    node["code"] = None if lazy else str(code[code_at[r]:code_at[r + 1]], "utf-8")
+                    if lazy:
+                        node["_code_row"] = r
+                yield node
+                continue
+            node = {
+                "id": str(ids[ids_at[k]:ids_at[k + 1] - 1], "utf-8") if k >= 0 else None,
+                "label": str(labels[label_at[r]:label_at[r + 1]], "utf-8"),
+                "code": str(code[code_at[r]:code_at[r + 1]], "utf-8") if present[r] and not lazy else None,
+                "type": types[type_codes[r]],
+            }
+            if lazy and present[r]:
+                node["_code_row"] = r
+            yield node
+
+    def categories(self, key="c1Output"):
+        """[(group metadata, member positions)] for one category key, in file order."""
+        indptr, indices = self._members.get(key, (np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int64)))
+        return [(g, indices[indptr[j]:indptr[j + 1]]) for j, g in enumerate(self._categories.get(key, []))]
+
+    def neighbors(self, k, kind="calls", direction="out"):
+        """Positions adjacent to k (targets for "out", sources for "in"), as a mapped slice."""
+        indptr, indices, _ = self._csr[(kind, direction)]
+        return indices[indptr[k]:indptr[k + 1]]
+
+    def parents(self, kind="contains"):
+        """{node id: id of its first in-neighbour} for every node with one, e.g. each symbol's container."""
+        if kind not in self.edge_types:
+            return {}
+        indptr, indices, _ = self._csr[(kind, "in")]
+        indptr = np.asarray(indptr)
+        has = np.flatnonzero(indptr[1:] > indptr[:-1])
+        ids = self.ids()
+        return {ids[k]: ids[p] for k, p in zip(has.tolist(), np.asarray(indices)[indptr[has]].tolist())}
+
+    def degree(self, k, kind="calls", direction="out"):
+        """Edge count (duplicates included) of k for one edge type and direction."""
+        return float(self._degree[(kind, direction)][k])
+
+    def csr(self, kind, direction="out"):
+        """(weight, indices, indptr): the argument order of scipy.sparse.csr_matrix."""
+        indptr, indices, weight = self._csr[(kind, direction)]
+        return weight, indices, indptr
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Write the graph snapshot for an analysis JSON and its code file")
+    parser.add_argument("--input", default=str(ANALYSIS), help=f"Analysis JSON (default {ANALYSIS})")
+    parser.add_argument("--code", default=str(ANALYSIS_WITH_CODE), help=f"Analysis JSON with node code (default {ANALYSIS_WITH_CODE})")
+    args = parser.parse_args()
+    path = build_index(args.input, code_path=args.code)
+    gi = GraphIndex(path)
+    print(f"[+] Graph index for {args.input}: {len(gi)} nodes ({gi.meta['code_rows']} code rows), "
+          f"edge types {', '.join(gi.edge_types)}, categories {', '.join(gi.meta['categories']) or 'none'} -> {path}")
+
+if __name__ == "__main__":
+    main()
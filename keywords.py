@@ -0,0 +1,123 @@
+import json
+from pathlib import Path
+
+# Optional: pyahocorasick's C automaton; falls back to a pure-Python one with the same hits
+try:
+    import ahocorasick
+    AHOCORASICK_OK = True
+except Exception:
+    AHOCORASICK_OK = False
+
+ROOT = Path(".")
+KEYWORDS_FILE = ROOT / "core" / "data" / "keywords.json"
+
+# Every keyword list the pipeline matches against. A KEYWORDS_FILE holding a JSON object
+# with any of these keys replaces that list, e.g. {"critical_files": ["routing", "db"]}.
+DEFAULT_KEYWORDS = {
+    # rank_func keyword_matches: counted where they start a word in a code body
+    "code": ["get", "set", "to_", "from_", "format", "util", "helper", "json", "str", "parse",
+             "is_", "has_", "len(", "join(", "split("],
+    # rank_func.is_critical: substrings of the node label / the file part of the node id
+    "critical_names": ["__init__", "decorator", "on_event", "setup", "configure", "mount"],
+    "critical_files": ["applications", "routing", "endpoints", "schemas", "models"],
+    # label.guess_label: substrings of the node label
+    "util_names": ["util", "helper", "parse", "to_", "from_", "convert",
+                   "str", "format", "encode", "decode", "validate", "calc",
+                   "sum", "avg", "is_", "has_", "print", "len", "split", "join", "replace"],
+    "core_names": ["route", "app", "endpoint", "request", "response", "schema", "model",
+                   "router", "startup", "shutdown", "include", "register", "mount",
+                   "middleware", "api", "handler", "process", "dispatch", "run"],
+}
+
+def load_keywords(path=KEYWORDS_FILE):
+    """DEFAULT_KEYWORDS with any lists overridden by the JSON file at path."""
+    lists = {k: list(v) for k, v in DEFAULT_KEYWORDS.items()}
+    path = Path(path)
+    if path.exists():
+        lists.update(json.loads(path.read_text(encoding="utf-8")))
+    return lists
+
+def _is_word(ch):
+    return ch.isalnum() or ch == "_"
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over a keyword list, matched case-insensitively.
+
+    The automaton is built once; each string is then scanned a single time no
+    matter how many keywords there are. With word_start=True only hits that
+    begin a word count, like a leading \\b in a regex.
+    """
+
+    def __init__(self, keywords, word_start=False):
+        self.keywords = list(dict.fromkeys(k.lower() for k in keywords if k))
+        self.word_start = word_start
+        if AHOCORASICK_OK:
+            self._auto = ahocorasick.Automaton()
+            for k in self.keywords:
+                self._auto.add_word(k, k)
+            self._auto.make_automaton()
+        else:
+            self._build()
+
+    def _build(self):
+        # trie, then failure links in BFS order, flattened into a complete transition table
+        goto, out = [{}], [()]
+        for k in self.keywords:
+            state = 0
+            for ch in k:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto.append({})
+                    out.append(())
+                    goto[state][ch] = nxt
+                state = nxt
+            out[state] += (k,)
+        delta = [dict(goto[0])] + [None] * (len(goto) - 1)
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for state in queue:
+            out[state] += out[fail[state]]
+            trans = dict(delta[fail[state]]) if state else {}
+            for ch, nxt in goto[state].items():
+                fail[nxt] = delta[fail[state]].get(ch, 0) if state else 0
+                trans[ch] = nxt
+                queue.append(nxt)
+            delta[state] = trans
+        self._delta, self._out = delta, out
+
+    def _scan(self, text):
+        if not self.keywords:
+            return
+        if AHOCORASICK_OK:
+            for end, k in self._auto.iter(text):
+                yield end - len(k) + 1, k
+            return
+        delta, out = self._delta, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            state = delta[state].get(ch, 0)
+            if out[state]:
+                for k in out[state]:
+                    yield i - len(k) + 1, k
+
+    def finditer(self, text):
+        """Yield (start, keyword) for every hit, overlapping ones included."""
+        text = str(text).lower()
+        for start, k in self._scan(text):
+            if self.word_start and start and _is_word(text[start - 1]):
+                continue
+            yield start, k
+
+    def count(self, text):
+        """Number of positions at which some keyword starts."""
+        return len({start for start, _ in self.finditer(text)})
+
+    def hits(self, text):
+        """The distinct keywords found in text, in keyword-list order."""
+        found = {k for _, k in self.finditer(text)}
+        return [k for k in self.keywords if k in found]
+
+    def search(self, text):
+        """True if any keyword occurs in text."""
+        return next(self.finditer(text), None) is not None
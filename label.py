@@ -1,7 +1,11 @@
+import json
 import re
+import numpy as np
 import pandas as pd
 from pathlib import Path
 
+from keywords import KeywordMatcher, load_keywords
+
 # Paths
 DATA_DIR = Path("core/data")
 CANDIDATES = DATA_DIR / "label_candidates.csv"
@@ -13,46 +17,87 @@ if not CANDIDATES.exists():
 
 df = pd.read_csv(CANDIDATES)
 
-def guess_label(row):
-    """Return 'utility', 'core', or '' (uncertain)."""
-    name = str(row.get("label", "")).lower()
-    file_id = str(row.get("id", "")).lower()
-    loc = float(row.get("loc", 0))
-    comp = float(row.get("complexity", 0))
-    kw = float(row.get("keyword_matches", 0))
-    one_liner = int(row.get("one_liner", 0))
-
-    # Patterns strongly indicating utility
-    util_keywords = [
-        "util", "helper", "parse", "to_", "from_", "convert",
-        "str", "format", "encode", "decode", "validate", "calc",
-        "sum", "avg", "is_", "has_", "print", "len", "split", "join", "replace"
-    ]
-
-    if any(k in name for k in util_keywords) or one_liner or loc <= 3 or kw >= 2:
-        return "utility"
-
-    # Patterns strongly indicating core logic
-    core_keywords = [
-        "route", "app", "endpoint", "request", "response", "schema", "model",
-        "router", "startup", "shutdown", "include", "register", "mount",
-        "middleware", "api", "handler", "process", "dispatch", "run"
-    ]
-
-    if any(k in name for k in core_keywords) or comp >= 6 or loc >= 20:
-        return "core"
-
-    # Fallback based on file path
-    if "utils" in file_id or "helpers" in file_id:
-        return "utility"
-    if "applications" in file_id or "routing" in file_id or "endpoints" in file_id:
-        return "core"
-
-    # Uncertain
-    return ""
+RULES_FILE = DATA_DIR / "label_rules.json"
+
+# Rules are tried in order and the first one with any matching condition labels the row;
+# rows no rule matches stay "" (uncertain). A condition is either
+#   {"field": f, "keywords": name}   f contains a word from a keywords.py list (case-insensitive)
+#   {"field": f, "contains": [...]}  f contains one of these substrings (case-insensitive)
+#   {"field": f, "op": o, "value": v} numeric comparison, o in < <= > >= == !=
+# RULES_FILE, if present, holds a JSON list in the same shape and replaces these defaults.
+DEFAULT_RULES = [
+    {"name": "utility_signals", "label": "utility", "any": [
+        {"field": "label", "keywords": "util_names"},
+        {"field": "one_liner", "op": "!=", "value": 0},
+        {"field": "loc", "op": "<=", "value": 3},
+        {"field": "keyword_matches", "op": ">=", "value": 2},
+    ]},
+    {"name": "core_signals", "label": "core", "any": [
+        {"field": "label", "keywords": "core_names"},
+        {"field": "complexity", "op": ">=", "value": 6},
+        {"field": "loc", "op": ">=", "value": 20},
+    ]},
+    {"name": "utility_path", "label": "utility", "any": [
+        {"field": "id", "contains": ["utils", "helpers"]},
+    ]},
+    {"name": "core_path", "label": "core", "any": [
+        {"field": "id", "contains": ["applications", "routing", "endpoints"]},
+    ]},
+]
+
+OPS = {"<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal,
+       "==": np.equal, "!=": np.not_equal}
+
+def load_rules(path=RULES_FILE):
+    path = Path(path)
+    if path.exists():
+        return json.loads(path.read_text(encoding="utf-8"))
+    return DEFAULT_RULES
+
+def text_mask(frame, field, matcher):
+    """Rows whose field contains a keyword; each distinct value is scanned only once."""
+    col = frame[field].astype(str) if field in frame else pd.Series("", index=frame.index)
+    codes, uniques = pd.factorize(col)
+    hit = np.fromiter((matcher.search(u) for u in uniques), dtype=bool, count=len(uniques))
+    return hit[codes]
+
+def numeric_mask(frame, field, op, value):
+    col = frame[field].astype(float).to_numpy() if field in frame else np.zeros(len(frame))
+    return OPS[op](col, value)
+
+def compile_rules(rules, keywords):
+    """Turn each condition into a function frame -> boolean mask, building every matcher once."""
+    compiled = []
+    for rule in rules:
+        conds = []
+        for cond in rule["any"]:
+            field = cond["field"]
+            if "keywords" in cond or "contains" in cond:
+                words = keywords[cond["keywords"]] if "keywords" in cond else cond["contains"]
+                matcher = KeywordMatcher(words)
+                conds.append(lambda f, field=field, m=matcher: text_mask(f, field, m))
+            else:
+                conds.append(lambda f, c=cond: numeric_mask(f, c["field"], c["op"], c["value"]))
+        compiled.append((rule["name"], rule["label"], conds))
+    return compiled
+
+def apply_rules(frame, compiled):
+    """Label every row at once; returns (labels, {rule name: rows it labeled})."""
+    labels = np.full(len(frame), "", dtype=object)
+    open_rows = np.ones(len(frame), dtype=bool)
+    hits = {}
+    for name, label, conds in compiled:
+        mask = np.zeros(len(frame), dtype=bool)
+        for cond in conds:
+            mask |= cond(frame)
+        won = mask & open_rows
+        labels[won] = label
+        open_rows &= ~won
+        hits[name] = int(won.sum())
+    return labels, hits
 
 # Apply heuristic labeling
-df["human_label"] = df.apply(guess_label, axis=1)
+df["human_label"], rule_hits = apply_rules(df, compile_rules(load_rules(), load_keywords()))
 
 # Summarize results
 counts = df["human_label"].value_counts(dropna=False)
@@ -66,6 +111,9 @@ print(f"Total rows:     {n_total}")
 print(f"Labeled 'core': {n_core}")
 print(f"Labeled 'utility': {n_util}")
 print(f"Uncertain (manual check): {n_uncertain}")
+print("--- Rule hits ---")
+for name, n in rule_hits.items():
+    print(f"{name}: {n}")
 print("===========================")
 
 # Save full labels
@@ -0,0 +1,191 @@
+import json
+import re
+from pathlib import Path
+
+# Optional: ijson's C (yajl2) backend for streaming; falls back to a stdlib scanner
+try:
+    import ijson.backends.yajl2_c as ijson_c
+    IJSON_OK = True
+except Exception:
+    IJSON_OK = False
+
+ROOT = Path(".")
+ANALYSIS_WITH_CODE = ROOT / "core" / "data" / "analysis-with-code.json"
+
+CHUNK = 1 << 20
+_WS = re.compile(r"[ \t\n\r]*")
+_decoder = json.JSONDecoder()
+
+class _Scanner:
+    """Incremental reader over a text stream that decodes one JSON value at a time.
+
+    Only the value being decoded (plus one read chunk) is held in memory, so
+    walking a large array costs memory proportional to its biggest element.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        if self.eof:
+            return False
+        if self.pos:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        # grow geometrically so a large value is rescanned O(log n) times, not O(n)
+        data = self.f.read(max(CHUNK, len(self.buf)))
+        if not data:
+            self.eof = True
+            return False
+        self.buf += data
+        return True
+
+    def peek(self):
+        while True:
+            self.pos = _WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, ch):
+        if self.peek() != ch:
+            raise ValueError(f"malformed JSON: expected {ch!r} at offset {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                val, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # a number ending exactly at the buffer edge may continue in the next chunk
+            if end == len(self.buf) and self._fill():
+                continue
+            self.pos = end
+            return val
+
+    def find(self, keys):
+        """Advance to the value at keys; KeyError if a key is missing."""
+        for key in keys:
+            self.expect("{")
+            while True:
+                if self.peek() == "}":
+                    raise KeyError(key)
+                k = self.value()
+                self.expect(":")
+                if k == key:
+                    break
+                self.value()  # sibling we do not need
+                if self.peek() == ",":
+                    self.pos += 1
+
+    def enter(self, keys):
+        """Advance to just inside the array at keys; KeyError if a key is missing."""
+        self.find(keys)
+        self.expect("[")
+
+    def members(self):
+        """Yield the keys of the object at the cursor; the caller consumes each value before resuming."""
+        self.expect("{")
+        while self.peek() != "}":
+            key = self.value()
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self.pos += 1
+        self.pos += 1
+
+    def items(self):
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            ch = self.peek()
+            self.pos += 1
+            if ch == "]":
+                return
+            if ch != ",":
+                raise ValueError(f"malformed JSON: expected ',' or ']' at offset {self.pos - 1}")
+
+def iter_json_items(path, keys):
+    """Yield the elements of the array at keys (e.g. ("analysisData", "graphNodes")) one at a time."""
+    path = Path(path)
+    if IJSON_OK:
+        with path.open("rb") as f:
+            yield from ijson_c.items(f, ".".join(keys) + ".item", use_float=True)
+        return
+    with path.open("r", encoding="utf-8") as f:
+        scanner = _Scanner(f)
+        try:
+            scanner.enter(keys)
+        except KeyError:
+            return
+        yield from scanner.items()
+
+def iter_json_arrays(path, keys, names):
+    """Yield (name, element) for the arrays named in names inside the object at keys, in one pass.
+
+    Arrays come in file order and other members are skipped, so a file holding several
+    large arrays is read and parsed once. This is the stdlib scanner even with ijson
+    installed: ijson streams one prefix per parse, and dispatching its events in Python
+    is slower than the scanner's per-element decode.
+    """
+    names = set(names)
+    with Path(path).open("r", encoding="utf-8") as f:
+        scanner = _Scanner(f)
+        try:
+            scanner.find(keys)
+        except KeyError:
+            return
+        for name in scanner.members():
+            if name in names and scanner.peek() == "[":
+                scanner.pos += 1
+                for item in scanner.items():
+                    yield name, item
+            else:
+                scanner.value()
+
+def read_json_key(path, key):
+    """Return one top-level value, decoding only the keys that precede it (None if absent)."""
+    with Path(path).open("r", encoding="utf-8") as f:
+        scanner = _Scanner(f)
+        scanner.expect("{")
+        while scanner.peek() == '"':
+            k = scanner.value()
+            scanner.expect(":")
+            if k == key:
+                return scanner.value()
+            scanner.value()
+            if scanner.peek() == ",":
+                scanner.pos += 1
+    return None
+
+def parse_node_id(node_id):
+    """Split 'code:<file>:<symbol>:<line>' into (file, symbol, line), or None."""
+    try:
+        head, symbol, line = str(node_id).rsplit(":", 2)
+        kind, file_path = head.split(":", 1)
+        return (file_path, symbol, int(line)) if kind == "code" else None
+    except ValueError:
+        return None
+
+def iter_graph_nodes(path=ANALYSIS_WITH_CODE):
+    return iter_json_items(path, ("analysisData", "graphNodes"))
+
+def iter_batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
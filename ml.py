@@ -9,6 +9,8 @@ from sklearn.metrics import classification_report, precision_recall_fscore_suppo
 from sklearn.preprocessing import StandardScaler
 from sklearn.pipeline import Pipeline
 import joblib
+from feature_store import load_frame, store_is_fresh
+from graph import GRAPH_COLS
 import warnings
 warnings.filterwarnings("ignore")
 
@@ -20,6 +22,9 @@ MODEL_OUT = ROOT / "core" / "data" / "rf_model.joblib"
 PRED_OUT = ROOT / "core" / "data" / "ranked_functions_ml.csv"
 
 def load_ranked_csv():
+    # prefer the memory-mapped columnar store written by rank_func.py
+    if store_is_fresh(CSV_IN):
+        return load_frame()
     if not CSV_IN.exists():
         raise FileNotFoundError(f"{CSV_IN} not found. Run rank_functions.py first.")
     df = pd.read_csv(CSV_IN)
@@ -52,7 +57,10 @@ def prepare_label_candidates(df, n_top=50, n_bottom=50, n_mid=50):
 def build_feature_matrix(df):
     # select features that were used by heuristic
     features = []
-    for c in ["loc", "complexity", "num_calls", "num_params", "doc_len", "keyword_matches", "num_imports", "one_liner", "has_type_annotations"]:
+    # call-graph columns (degree, PageRank, per-seed ppr_*) are present when rank_func.py ran with a graph,
+    # clone_group_size when it could build clone signatures
+    seed_cols = [c for c in df.columns if c.startswith("ppr_")]
+    for c in ["loc", "complexity", "num_calls", "num_params", "doc_len", "keyword_matches", "num_imports", "one_liner", "has_type_annotations", "clone_group_size"] + GRAPH_COLS + seed_cols:
         if c in df.columns:
             features.append(c)
     X = df[features].fillna(0).astype(float)
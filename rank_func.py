@@ -1,9 +1,25 @@
 import json
 import ast
+import inspect
+import keyword
 import re
+import tokenize
 import sys
+import argparse
+import functools
+import heapq
+import operator
+import tempfile
+import textwrap
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+from call_edges import CALL_COLS, CallSites, encode_calls
+from feature_cache import FeatureCache, CACHE_DB, body_digest, code_digest
+from keywords import DEFAULT_KEYWORDS, KeywordMatcher, load_keywords
+from loader import iter_graph_nodes, iter_json_items, iter_batches, parse_node_id, read_json_key
+
 # Optional: pandas for CSV output (falls back to csv module)
 try:
     import pandas as pd
@@ -11,152 +27,693 @@ try:
 except Exception:
     PANDAS_OK = False
 
+# Optional: numpy for vectorized scoring (falls back to per-row loops)
+try:
+    import numpy as np
+    NUMPY_OK = True
+except Exception:
+    NUMPY_OK = False
+
+# Optional: scipy-backed call-graph features (degree, PageRank) from analysis.json edges
+try:
+    from graph import ANALYSIS, GRAPH_COLS, GraphFeatures
+    from graph_index import GraphIndex
+    GRAPH_OK = True
+except Exception:
+    GRAPH_OK = False
+
+# Optional: MinHash/LSH clone groups (numpy + scipy); without it bodies carry no signature
+try:
+    from clones import CLONE_COLS, SIG_COL, CloneIndex, clone_signature
+    CLONES_OK = True
+except Exception:
+    CLONE_COLS, SIG_COL = [], "clone_sig"
+    CLONES_OK = False
+
 ROOT = Path(".")
 INPUT = ROOT / "core" / "data" / "analysis-with-code.json"
 OUT_CSV = ROOT / "core" / "data" / "ranked_functions_scores.csv"
 OUT_JSON = ROOT / "core" / "data" / "ranked_functions.json"
 
-if not INPUT.exists():
-    print(f"ERROR: input file not found at {INPUT}", file=sys.stderr)
-    sys.exit(1)
-
-with INPUT.open("r", encoding="utf-8") as f:
-    data = json.load(f)
-
-nodes = data.get("analysisData", {}).get("graphNodes", [])
-print(f"[+] Found {len(nodes)} nodes in input JSON. Processing...")
+# nodes are streamed from the input and extracted this many at a time
+STREAM_BATCH = 5000
+# spilled JSON per sorted run in --out-of-core mode; as Python rows a run takes about 8x this
+OOC_RUN_BYTES = 4 << 20
 
 # AST helpers
-BRANCH_NODES = (ast.If, ast.For, ast.While, ast.IfExp, ast.Try, ast.ExceptHandler, ast.With)
-
 def safe_parse(code_str):
     if not code_str or not isinstance(code_str, str):
         return None
     try:
         return ast.parse(code_str)
     except Exception:
-        # wrap in a dummy function to try to parse fragments
-        try:
-            wrapped = "def __wrapper__():\n" + "\n".join("    " + ln for ln in code_str.splitlines())
-            return ast.parse(wrapped)
-        except Exception:
-            return None
+        # fragments go to extract_lexical_features instead of a second, wrapped parse
+        return None
 
-def compute_cyclomatic_complexity(tree):
-    if tree is None:
-        return 0
-    count = 0
-    for node in ast.walk(tree):
-        if isinstance(node, BRANCH_NODES):
-            count += 1
-        if isinstance(node, ast.BoolOp):
-            count += max(0, len(node.values) - 1)
-    return max(1, count + 1)
-
-def count_nodes_of_type(tree, t):
-    if tree is None:
-        return 0
-    return sum(1 for n in ast.walk(tree) if isinstance(n, t))
+def dotted_name(expr):
+    """Call target as a dotted name: "a.b.c" for names and attributes, ".c" when the
+    chain starts at some other expression (a call, a subscript), None otherwise."""
+    parts = []
+    while isinstance(expr, ast.Attribute):
+        parts.append(expr.attr)
+        expr = expr.value
+    if isinstance(expr, ast.Name):
+        parts.append(expr.id)
+    elif parts:
+        parts.append("")
+    return ".".join(reversed(parts)) or None
 
-def extract_docstring_length(tree):
-    if tree is None:
-        return 0
-    doc = ast.get_docstring(tree)
-    if doc:
-        return len(doc)
-    # fallback: first FunctionDef's docstring
-    for node in ast.walk(tree):
-        if isinstance(node, ast.FunctionDef):
+class FeatureVisitor(ast.NodeVisitor):
+    """Collect every AST-derived feature of a node in a single traversal."""
+
+    def __init__(self):
+        self.branches = 0
+        self.num_funcs = 0
+        self.num_calls = 0
+        self.num_returns = 0
+        self.num_assigns = 0
+        self.num_imports = 0
+        self.has_annotations = False
+        # ast.walk is breadth-first, so "first" means shallowest, then leftmost
+        self._depth = 0
+        self._first_def = None
+        self._first_lambda = None
+        self._first_doc = None
+        # node types in visit order, the shingle source for clone signatures
+        self.shape = []
+        # dotted call targets outside any class body (methods are nodes of their own), and
+        # local name -> qualified name bindings of the body's imports, for call edge synthesis
+        self.call_targets = []
+        self.imports = {}
+        self._class_depth = 0
+
+    def visit(self, node):
+        self.shape.append(type(node).__name__)
+        if isinstance(node, ast.ClassDef):
+            self._class_depth += 1
+            try:
+                return super().visit(node)
+            finally:
+                self._class_depth -= 1
+        return super().visit(node)
+
+    def generic_visit(self, node):
+        self._depth += 1
+        super().generic_visit(node)
+        self._depth -= 1
+
+    def _branch(self, node):
+        self.branches += 1
+        self.generic_visit(node)
+
+    visit_If = visit_For = visit_While = visit_IfExp = _branch
+    visit_Try = visit_ExceptHandler = visit_With = _branch
+
+    def visit_BoolOp(self, node):
+        self.branches += max(0, len(node.values) - 1)
+        self.generic_visit(node)
+
+    def visit_FunctionDef(self, node):
+        self.num_funcs += 1
+        if self._first_def is None or self._depth < self._first_def[0]:
+            self._first_def = (self._depth, node)
+        if self._first_doc is None or self._depth < self._first_doc[0]:
             ds = ast.get_docstring(node)
             if ds:
-                return len(ds)
-    return 0
+                self._first_doc = (self._depth, len(ds))
+        if node.returns is not None:
+            self.has_annotations = True
+        self.generic_visit(node)
+
+    def visit_AsyncFunctionDef(self, node):
+        # not counted in num_funcs (nor by the lexical scan), but "-> T" still annotates it
+        if node.returns is not None:
+            self.has_annotations = True
+        self.generic_visit(node)
+
+    def visit_Lambda(self, node):
+        if self._first_lambda is None or self._depth < self._first_lambda[0]:
+            self._first_lambda = (self._depth, node)
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        self.num_calls += 1
+        if not self._class_depth:
+            target = dotted_name(node.func)
+            if target:
+                self.call_targets.append(target)
+        self.generic_visit(node)
+
+    def visit_Return(self, node):
+        self.num_returns += 1
+        self.generic_visit(node)
+
+    def visit_Assign(self, node):
+        self.num_assigns += 1
+        self.generic_visit(node)
+
+    visit_AugAssign = visit_Assign
+
+    def visit_Import(self, node):
+        self.num_imports += 1
+        for a in node.names:
+            # "import a.b" binds a; "import a.b as c" binds c to a.b
+            self.imports[a.asname or a.name.split(".")[0]] = a.name if a.asname else a.name.split(".")[0]
+        self.generic_visit(node)
+
+    def visit_ImportFrom(self, node):
+        self.num_imports += 1
+        module = "." * node.level + (node.module or "")
+        for a in node.names:
+            if a.name != "*":
+                self.imports[a.asname or a.name] = f"{module}.{a.name}" if node.module else module + a.name
+        self.generic_visit(node)
 
-keyword_pattern = re.compile(
-    r"\b(get|set|to_|from_|format|util|helper|json|str|parse|is_\w+|has_\w+|len\(|join\(|split\()",
-    flags=re.IGNORECASE
+    def visit_AnnAssign(self, node):
+        self.has_annotations = True
+        self.generic_visit(node)
+
+    def visit_arg(self, node):
+        if node.annotation is not None:
+            self.has_annotations = True
+        self.generic_visit(node)
+
+    @property
+    def complexity(self):
+        return max(1, self.branches + 1)
+
+    @property
+    def num_params(self):
+        first = self._first_def or self._first_lambda
+        return len(first[1].args.args) if first else 0
+
+    def doc_len(self, tree):
+        doc = ast.get_docstring(tree)
+        if doc:
+            return len(doc)
+        return self._first_doc[1] if self._first_doc else 0
+
+
+def extract_ast_features(tree):
+    if tree is None:
+        return {"complexity": 0, "num_funcs": 0, "num_params": 0, "num_calls": 0,
+                "num_returns": 0, "num_assigns": 0, "num_imports": 0, "doc_len": 0,
+                "has_annotations": False, "shape": [], "call_targets": [], "imports": {}}
+    v = FeatureVisitor()
+    v.visit(tree)
+    return {
+        "complexity": v.complexity,
+        "num_funcs": v.num_funcs,
+        "num_params": v.num_params,
+        "num_calls": v.num_calls,
+        "num_returns": v.num_returns,
+        "num_assigns": v.num_assigns,
+        "num_imports": v.num_imports,
+        "doc_len": v.doc_len(tree),
+        "has_annotations": v.has_annotations,
+        "shape": v.shape,
+        "call_targets": v.call_targets,
+        "imports": v.imports,
+    }
+
+# Lexical fallback: one linear token scan approximating the AST features, for fragments
+# that do not parse (truncated windows, dangling ") -> T:" headers) and for --fast.
+# Tokens come from one compiled regex rather than the stdlib tokenize module, which is
+# pure Python and costs more per node than ast.parse itself.
+BRANCH_KEYWORDS = {"if", "elif", "for", "while", "try", "except", "with", "and", "or"}
+AUG_ASSIGN_OPS = {"+=", "-=", "*=", "/=", "//=", "%=", "**=", ">>=", "<<=", "&=", "|=", "^=", "@="}
+_TOKEN_RE = re.compile(
+    r"(?P<ws>[ \t\f]+|\\\r?\n|#[^\r\n]*)"
+    r"|(?P<nl>\r?\n)"
+    r"|(?P<string>[rRbBuUfF]{0,2}(?:'''[\s\S]*?(?:'''|\Z)|\"\"\"[\s\S]*?(?:\"\"\"|\Z)"
+    r"|'(?:[^'\\\r\n]|\\[\s\S])*'?|\"(?:[^\"\\\r\n]|\\[\s\S])*\"?))"
+    r"|(?P<name>[^\W\d]\w*)"
+    r"|(?P<number>\.?\d[\w.]*)"
+    r"|(?P<op>\*\*=?|//=?|>>=|<<=|->|:=|\.\.\.|[-+*/%@&|^<>=!]=|\S)"
 )
+_TOKEN_TYPES = {"string": tokenize.STRING, "name": tokenize.NAME, "number": tokenize.NUMBER, "op": tokenize.OP}
+_FSTRING_CALL = re.compile(r"[\w)\]]\(")
 
-rows = []
-for node in nodes:
-    # Preserve original node dict (keeps hidden metadata)
-    original_node = dict(node) if isinstance(node, dict) else {"id": str(node)}
+def _tokens(code):
+    """Yield (type, string) like tokenize, without comments, blank lines or INDENT/DEDENT."""
+    depth = 0
+    pending = False     # the current logical line has tokens
+    for m in _TOKEN_RE.finditer(code):
+        kind = m.lastgroup
+        if kind == "ws":
+            continue
+        if kind == "nl":
+            if depth == 0 and pending:
+                yield tokenize.NEWLINE, "\n"
+                pending = False
+            continue
+        s = m.group()
+        if kind == "op":
+            if s in ("(", "[", "{"):
+                depth += 1
+            elif s in (")", "]", "}"):
+                depth = max(0, depth - 1)
+        pending = True
+        yield _TOKEN_TYPES[kind], s
+    if pending:
+        yield tokenize.NEWLINE, ""
+    yield tokenize.ENDMARKER, ""
 
-    node_id = original_node.get("id")
-    label = original_node.get("label", "") or ""
-    code = original_node.get("code", "") or ""
+def extract_lexical_features(code):
+    """Approximate extract_ast_features from tokens alone; never raises on broken code."""
+    branches = funcs = calls = returns = assigns = imports = 0
+    params = lambda_params = None
+    doc_len = 0
+    pending_doc = None
+    depth = 0
+    comp = [False]          # per bracket level: is it a comprehension (its for/if are not branches)
+    prev_type = prev = prev2 = None
+    def_header = def_body = False   # inside a def header / at the start of its body (docstring spot)
+    stmt_assigned = stmt_annotated = False
+    annotated = False       # "->", an annotated def parameter, or "name: T" as a statement
+    # first def's / lambda's positional parameters: mode, paren depth, count, saw bare * / **
+    mode = None
+    mode_depth = n_params = 0
+    starred = False
+    shape = []              # keywords and operators verbatim, other tokens by type (clone shingles)
+    call_targets = []
+    dotted = None           # the a.b.c chain ending at the current token
+    in_class = False        # calls after a "class" statement belong to its methods' nodes
 
-    # static features
-    loc = len([ln for ln in str(code).splitlines() if ln.strip() != ""])
-    tree = safe_parse(code)
-    complexity = compute_cyclomatic_complexity(tree)
-    num_funcs = count_nodes_of_type(tree, ast.FunctionDef)
-    num_params = 0
-    if tree:
-        fdefs = [n for n in ast.walk(tree) if isinstance(n, ast.FunctionDef)]
-        if fdefs:
-            try:
-                num_params = len(fdefs[0].args.args)
-            except Exception:
-                num_params = 0
-        else:
-            lambdas = [n for n in ast.walk(tree) if isinstance(n, ast.Lambda)]
-            if lambdas:
+    if not code or not isinstance(code, str):
+        return extract_ast_features(None)
+    for ttype, s in _tokens(code):
+        shape.append(s if ttype == tokenize.OP or keyword.iskeyword(s) else tokenize.tok_name[ttype])
+        if pending_doc is not None:
+            if ttype in (tokenize.NEWLINE, tokenize.ENDMARKER):
                 try:
-                    num_params = len(lambdas[0].args.args)
+                    doc_len = len(inspect.cleandoc(ast.literal_eval(pending_doc)))
                 except Exception:
-                    num_params = 0
+                    doc_len = 0
+            pending_doc = None
+        if ttype == tokenize.NEWLINE:
+            stmt_assigned = stmt_annotated = False
+
+        if ttype == tokenize.NAME:
+            dotted = (dotted or "") + "." + s if prev == "." else (None if keyword.iskeyword(s) else s)
+            if s == "class" and prev_type in (None, tokenize.NEWLINE):
+                in_class = True
+            is_async = prev == "async"
+            if s == "for" and depth:
+                comp[-1] = True     # a for inside brackets is always a comprehension
+            elif s == "if" and depth and comp[-1] or s in ("for", "with") and is_async:
+                pass
+            elif s in BRANCH_KEYWORDS:
+                branches += 1
+            if s == "def":
+                def_header = not is_async
+                if not is_async:
+                    funcs += 1
+                    if params is None and mode is None:
+                        mode = "def"
+            elif s == "return":
+                returns += 1
+            elif s == "import":
+                imports += 1
+            elif s == "lambda" and params is None and lambda_params is None and mode is None:
+                mode, mode_depth, n_params, starred = "lambda", depth, 0, False
+            elif mode == "params" and depth == mode_depth and not starred and prev in ("(", ","):
+                n_params += 1
+            elif mode == "lambda" and depth == mode_depth and not starred and prev in ("lambda", ","):
+                n_params += 1
+        elif ttype == tokenize.OP:
+            if s in ("(", "[", "{"):
+                if s == "(" and prev is not None and (prev in (")", "]") or (
+                        prev_type == tokenize.NAME and not keyword.iskeyword(prev)
+                        and prev2 not in ("def", "class"))):
+                    calls += 1
+                    if prev_type == tokenize.NAME and dotted and not in_class:
+                        call_targets.append(dotted)
+                depth += 1
+                comp.append(False)
+                if s == "(" and mode == "def" and prev2 == "def":
+                    mode, mode_depth, n_params, starred = "params", depth, 0, False
+            elif s in (")", "]", "}"):
+                depth = max(0, depth - 1)
+                if len(comp) > 1:
+                    comp.pop()
+                if mode == "params" and depth < mode_depth:
+                    params, mode = n_params, None
+            elif s in ("*", "**") and mode in ("params", "lambda") and depth == mode_depth:
+                starred = True
+            elif s == ":" and mode == "lambda" and depth == mode_depth:
+                lambda_params, mode = n_params, None
+            elif s == ":" and mode == "params" and depth == mode_depth:
+                annotated = True
+            elif s == ":" and depth == 0:
+                if prev_type == tokenize.NAME and not keyword.iskeyword(prev) and prev2 in (None, "\n"):
+                    annotated = True
+                stmt_annotated = True
+            elif s == "->":
+                annotated = True
+            elif depth == 0 and (s == "=" or s in AUG_ASSIGN_OPS):
+                # one Assign per statement (a = b = 1); "x: T = v" is an AnnAssign
+                if not stmt_assigned and not (s == "=" and stmt_annotated):
+                    assigns += 1
+                stmt_assigned = True
+        elif ttype == tokenize.STRING:
+            if s.lstrip("rRbBuU")[:1] in ("f", "F"):
+                # f-strings are one token here; count calls inside their {fields} roughly
+                calls += len(_FSTRING_CALL.findall(s))
+            if doc_len == 0 and (prev is None or def_body and prev_type == tokenize.NEWLINE):
+                pending_doc = s
+        if ttype == tokenize.NEWLINE:
+            def_body, def_header = def_header, False
+        else:
+            def_body = False
+        if ttype != tokenize.NAME and s != ".":
+            dotted = None
+        prev_type, prev2, prev = ttype, prev, s
+
+    if params is None:
+        params = lambda_params if lambda_params is not None else (n_params if mode == "params" else 0)
+    return {
+        "complexity": max(1, branches + 1),
+        "num_funcs": funcs,
+        "num_params": params,
+        "num_calls": calls,
+        "num_returns": returns,
+        "num_assigns": assigns,
+        "num_imports": imports,
+        "doc_len": doc_len,
+        "has_annotations": annotated,
+        "shape": shape,
+        "call_targets": call_targets,
+        "imports": {},
+    }
+
+KEYWORDS = load_keywords()
+code_keywords = KeywordMatcher(KEYWORDS["code"], word_start=True)
+
+def extract_text_features(code):
+    """loc, keyword_matches and one_liner from one line split and one automaton scan."""
+    nonblank = [i for i, ln in enumerate(code.splitlines()) if ln and not ln.isspace()]
+    loc = len(nonblank)
+    # at most 3 lines from the first non-blank line to the last, blank ones included
+    one_liner = 1 if loc <= 3 and (not nonblank or nonblank[-1] - nonblank[0] < 3) else 0
+    return {"loc": loc, "keyword_matches": code_keywords.count(code), "one_liner": one_liner}
 
-    num_calls = count_nodes_of_type(tree, ast.Call)
-    num_returns = count_nodes_of_type(tree, ast.Return)
-    num_assigns = count_nodes_of_type(tree, ast.Assign) + count_nodes_of_type(tree, ast.AugAssign)
-    num_imports = count_nodes_of_type(tree, ast.Import) + count_nodes_of_type(tree, ast.ImportFrom)
-    doc_len = extract_docstring_length(tree)
-    keyword_matches = len(keyword_pattern.findall(str(code)))
-    one_liner = 1 if loc <= 3 and len(str(code).strip().splitlines()) <= 3 else 0
-    has_type_annotations = 1 if (":" in str(code) and "->" in str(code)) or (":" in str(code) and re.search(r":\s*\w", str(code))) else 0
+# Bump whenever extract_features changes so cached vectors are not reused
+EXTRACTOR_VERSION = "6"
+
+FEATURE_COLS = ["loc", "complexity", "num_funcs", "num_params", "num_calls", "num_returns",
+                "num_assigns", "num_imports", "doc_len", "keyword_matches", "one_liner",
+                "has_type_annotations"]
+_feature_getter = operator.itemgetter(*FEATURE_COLS)
+# what extraction yields per body: the features plus its clone signature and call targets (cached together)
+EXTRACTED_COLS = FEATURE_COLS + [SIG_COL] + CALL_COLS
+
+def extractor_version(fast=False):
+    # --fast features come from tokens only, so they must never mix with parsed ones;
+    # a customised code keyword list changes keyword_matches, so it is part of the version too
+    version = EXTRACTOR_VERSION + ("-fast" if fast else "")
+    if KEYWORDS["code"] != DEFAULT_KEYWORDS["code"]:
+        version += "+kw" + code_digest("\n".join(KEYWORDS["code"]))[:8]
+    return version
+
+def extract_features(code, tree=None, fast=False):
+    """Static features, clone signature and call targets of one code body; depends on nothing but the code.
+
+    Code that does not parse (or every body, with fast=True) gets the lexical approximation.
+    """
+    code = code if isinstance(code, str) else str(code)
+    if tree is None and not fast:
+        tree = safe_parse(code)
+    feats = extract_ast_features(tree) if tree is not None else extract_lexical_features(code)
+    text = extract_text_features(code)
+    call_targets, call_imports = encode_calls(feats["call_targets"], feats["imports"])
+    return {
+        "loc": text["loc"],
+        "complexity": float(feats["complexity"]),
+        "num_funcs": int(feats["num_funcs"]),
+        "num_params": int(feats["num_params"]),
+        "num_calls": int(feats["num_calls"]),
+        "num_returns": int(feats["num_returns"]),
+        "num_assigns": int(feats["num_assigns"]),
+        "num_imports": int(feats["num_imports"]),
+        "doc_len": int(feats["doc_len"]),
+        "keyword_matches": text["keyword_matches"],
+        "one_liner": text["one_liner"],
+        "has_type_annotations": int(feats["has_annotations"]),
+        SIG_COL: clone_signature(feats["shape"]) if CLONES_OK else "",
+        "call_targets": call_targets,
+        "call_imports": call_imports,
+    }
+
+def code_snippet(code):
+    # keep a tiny snippet in case it's inspected later
+    code = str(code or "")
+    return code[:1000] + "..." if len(code) > 1000 else code
+
+def build_row(node, feats):
+    # Preserve original node dict (keeps hidden metadata)
+    original_node = dict(node) if isinstance(node, dict) else {"id": str(node)}
+    code = original_node.get("code", "") or ""
 
     # create a combined row: keep original fields then add analysis features
     row = dict(original_node)  # preserves any hidden fields
-    row.update({
-        "id": node_id,
-        "label": label,
-        "loc": int(loc),
-        "complexity": float(complexity),
-        "num_funcs": int(num_funcs),
-        "num_params": int(num_params),
-        "num_calls": int(num_calls),
-        "num_returns": int(num_returns),
-        "num_assigns": int(num_assigns),
-        "num_imports": int(num_imports),
-        "doc_len": int(doc_len),
-        "keyword_matches": int(keyword_matches),
-        "one_liner": int(one_liner),
-        "has_type_annotations": int(has_type_annotations),
-        # keep a tiny snippet in case it's inspected later
-        "code_snippet": (str(code)[:1000] + "...") if len(str(code)) > 1000 else str(code)
-    })
-    rows.append(row)
+    row["id"] = original_node.get("id")
+    row["label"] = original_node.get("label", "") or ""
+    row.update(feats)
+    row["code_snippet"] = code_snippet(code)
+    return row
+
+# Parse reuse: a Class (or outer def) node's code contains the source of the
+# Method/Function nodes inside it, so parse the outermost node once and hand
+# each member the matching subtree instead of re-parsing its code.
+DEF_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+def _code_of(node):
+    code = node.get("code") if isinstance(node, dict) else None
+    return code if isinstance(code, str) else ""
+
+def build_parse_groups(nodes, parents=None):
+    """Group node indices by outermost enclosing code node; group[0] is the one to parse.
+
+    parents maps a node id to its container's id (the graph's contains edges, see
+    GraphIndex.parents); without it containment comes from the line spans in the ids.
+    """
+    index_of = {}
+    for i, node in enumerate(nodes):
+        if isinstance(node, dict) and _code_of(node):
+            index_of.setdefault(node.get("id"), i)
+
+    root = {}
+    if parents:
+        parent = {}
+        for node_id, i in index_of.items():
+            p = index_of.get(parents.get(node_id))
+            if p is not None and p != i:
+                parent[i] = p
+        for i in parent:
+            r, seen = i, {i}
+            while r in parent and parent[r] not in seen:
+                r = parent[r]
+                seen.add(r)
+            root[i] = r
+    else:
+        # no contains edges: derive containment from file + line spans in the ids
+        by_file = {}
+        for node_id, i in index_of.items():
+            parsed = parse_node_id(node_id)
+            if parsed:
+                end = parsed[2] + _code_of(nodes[i]).count("\n")
+                by_file.setdefault(parsed[0], []).append((parsed[2], -end, i))
+        for spans in by_file.values():
+            spans.sort()
+            stack = []
+            for line, neg_end, i in spans:
+                while stack and -stack[-1][1] < line:
+                    stack.pop()
+                if stack:
+                    root[i] = stack[0][2]
+                stack.append((line, neg_end, i))
+
+    members = {}
+    for i, r in root.items():
+        if r != i:
+            members.setdefault(r, []).append(i)
+    return [[i] + members.get(i, []) for i in range(len(nodes)) if root.get(i, i) == i]
+
+def _start_line(d):
+    return min([d.lineno] + [x.lineno for x in d.decorator_list])
+
+def index_subtrees(tree, node_id):
+    """Map (symbol, absolute line) of each definition nested in a parsed node to its subtree."""
+    parsed = parse_node_id(node_id)
+    if tree is None or parsed is None:
+        return {}
+    defs = [n for n in ast.walk(tree) if isinstance(n, DEF_NODES)]
+    own = next((d for d in defs if d.name == parsed[1]), None)
+    if own is None:
+        return {}
+    offset = parsed[2] - _start_line(own)
+    return {(d.name, _start_line(d) + offset): d for d in defs if d is not own}
+
+def extract_group(group, fast=False):
+    """Extract features for [(index, node), ...] whose first entry encloses the others."""
+    if fast:
+        return [(i, extract_features(_code_of(node), fast=True)) for i, node in group]
+    (i0, root_node), members = group[0], group[1:]
+    root_tree = safe_parse(_code_of(root_node))
+    # a root that failed to parse goes straight to the lexical pass, not a second parse
+    results = [(i0, extract_features(_code_of(root_node), tree=root_tree, fast=root_tree is None))]
+    subtrees = index_subtrees(root_tree, root_node.get("id")) if members else {}
+    root_lines = _code_of(root_node).splitlines()
+    for i, node in members:
+        parsed = parse_node_id(node.get("id"))
+        sub = subtrees.get(parsed[1:]) if parsed else None
+        # member code is sometimes a shifted or truncated window; only reuse an identical body
+        if sub is not None:
+            segment = "\n".join(root_lines[_start_line(sub) - 1:sub.end_lineno])
+            if textwrap.dedent(segment).strip() != textwrap.dedent(_code_of(node)).strip():
+                sub = None
+        tree = ast.Module(body=[sub], type_ignores=[]) if sub is not None else None
+        results.append((i, extract_features(_code_of(node), tree=tree)))
+    return results
+
+def balanced_chunks(nodes, groups, n_chunks):
+    """Split parse groups into chunks of similar total code size, largest bodies first."""
+    size = [sum(len(_code_of(nodes[i])) for i in g) for g in groups]
+    order = sorted(range(len(groups)), key=lambda g: size[g], reverse=True)
+    n_chunks = max(1, min(n_chunks, len(order)))
+    heap = [(0, k) for k in range(n_chunks)]
+    chunks = [[] for _ in range(n_chunks)]
+    totals = [0] * n_chunks
+    for g in order:
+        # greedy longest-processing-time: give the next biggest group to the lightest chunk
+        total, k = heapq.heappop(heap)
+        chunks[k].append([(i, nodes[i]) for i in groups[g]])
+        totals[k] = total + size[g] + 1
+        heapq.heappush(heap, (totals[k], k))
+    # heaviest chunks go to the pool first so stragglers are small
+    ranked = sorted(range(n_chunks), key=lambda k: totals[k], reverse=True)
+    return [chunks[k] for k in ranked if chunks[k]]
+
+def _extract_chunk(chunk, fast=False):
+    return [r for group in chunk for r in extract_group(group, fast=fast)]
+
+def _extract_features(nodes, workers=1, parents=None, pool=None, fast=False):
+    groups = build_parse_groups(nodes, parents)
+    feats = [None] * len(nodes)
+    if (workers <= 1 and pool is None) or len(groups) < 2:
+        for g in groups:
+            for i, f in extract_group([(i, nodes[i]) for i in g], fast=fast):
+                feats[i] = f
+        return feats
+    own_pool = pool is None
+    if own_pool:
+        pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        chunks = balanced_chunks(nodes, groups, getattr(pool, "_max_workers", workers) * 4)
+        for results in pool.map(functools.partial(_extract_chunk, fast=fast), chunks):
+            for i, f in results:
+                feats[i] = f
+    finally:
+        if own_pool:
+            pool.shutdown()
+    return feats
+
+def load_previous_features(path, version=EXTRACTOR_VERSION):
+    """Map id -> (code digest, features) from an earlier ranked_functions.json."""
+    path = Path(path)
+    if not path.exists():
+        print(f"WARNING: previous run {path} not found, ranking from scratch.", file=sys.stderr)
+        return {}
+    if read_json_key(path, "extractor_version") != version:
+        print(f"WARNING: {path} was written by another extractor version, ranking from scratch.", file=sys.stderr)
+        return {}
+    out = {}
+    for r in iter_json_items(path, ("function_rankings",)):
+        if all(c in r for c in EXTRACTED_COLS):
+            digest = r.get("code_digest") or code_digest(_code_of(r))
+            out[r.get("id")] = (digest, {c: r[c] for c in EXTRACTED_COLS})
+    return out
+
+def extract_rows(nodes, workers=1, parents=None, cache=None, previous=None, pool=None, counts=None, fast=False):
+    """Feature rows for nodes, reusing a previous run and the cache before extracting.
+
+    counts, if given, is a Counter that accumulates unchanged/changed/added tallies
+    and "shared_body", the nodes whose body was already extracted in this batch.
+    """
+    feats = [None] * len(nodes)
+    if previous:
+        for i, node in enumerate(nodes):
+            hit = previous.get(node.get("id")) if isinstance(node, dict) else None
+            if hit is None:
+                status = "added"
+            elif hit[0] == code_digest(_code_of(node)):
+                feats[i] = dict(hit[1])
+                status = "unchanged"
+            else:
+                status = "changed"
+            if counts is not None:
+                counts[status] += 1
+
+    keys = {}
+    if cache is not None:
+        keys = {i: cache.key(_code_of(nodes[i])) for i, f in enumerate(feats) if f is None}
+        found = cache.get_many(list(keys.values()))
+        for i, k in keys.items():
+            if k in found:
+                feats[i] = dict(zip(EXTRACTED_COLS, found[k]))
+
+    todo = [i for i, f in enumerate(feats) if f is None]
+    if todo:
+        # extract each distinct body once; nodes repeating it (up to blank edges) get a copy
+        body = {i: body_digest(_code_of(nodes[i])) for i in todo}
+        first = {}
+        for i in todo:
+            first.setdefault(body[i], i)
+        unique = list(first.values())
+        fresh = _extract_features([nodes[i] for i in unique], workers=workers, parents=parents, pool=pool, fast=fast)
+        by_body = {body[i]: f for i, f in zip(unique, fresh)}
+        for i in todo:
+            feats[i] = dict(by_body[body[i]])
+        if counts is not None:
+            counts["shared_body"] += len(todo) - len(unique)
+        if cache is not None:
+            cache.put_many((keys[i], [feats[i][c] for c in EXTRACTED_COLS]) for i in unique)
+
+    return [build_row(node, f) for node, f in zip(nodes, feats)]
 
 # Normalize numeric features (min-max)
 numeric_cols = ["loc", "complexity", "num_funcs", "num_params", "num_calls",
                 "num_returns", "num_assigns", "num_imports", "doc_len", "keyword_matches"]
 
-def min_max(vals):
+def min_max(vals, bounds=None):
     if not vals:
         return []
-    mn = min(vals)
-    mx = max(vals)
+    mn, mx = bounds if bounds is not None else (min(vals), max(vals))
     if abs(mx - mn) < 1e-12:
         return [0.0 for _ in vals]
     return [(v - mn) / (mx - mn) for v in vals]
 
-col_vals = {c: [r.get(c, 0) for r in rows] for c in numeric_cols}
-col_norm = {c: min_max(col_vals[c]) for c in numeric_cols}
-
-for i, r in enumerate(rows):
+def column_bounds(rows, bounds=None):
+    """Fold rows into running {col: (min, max)} over numeric_cols."""
+    bounds = dict(bounds or {})
     for c in numeric_cols:
-        r[f"{c}_norm"] = float(col_norm[c][i])
+        vals = [r.get(c, 0) for r in rows]
+        if not vals:
+            continue
+        lo, hi = min(vals), max(vals)
+        if c in bounds:
+            lo, hi = min(lo, bounds[c][0]), max(hi, bounds[c][1])
+        bounds[c] = (lo, hi)
+    return bounds
+
+def normalize_rows(rows, bounds=None):
+    col_vals = {c: [r.get(c, 0) for r in rows] for c in numeric_cols}
+    col_norm = {c: min_max(col_vals[c], bounds[c] if bounds else None) for c in numeric_cols}
+
+    for i, r in enumerate(rows):
+        for c in numeric_cols:
+            r[f"{c}_norm"] = float(col_norm[c][i])
 
 # Heuristic weights
 weights = {
@@ -169,6 +726,39 @@ weights = {
     "num_imports_norm": 0.05
 }
 
+critical_names = KeywordMatcher(KEYWORDS["critical_names"])
+critical_files = KeywordMatcher(KEYWORDS["critical_files"])
+
+def _file_part(node_id):
+    # "code:<file>" of a code id, so a symbol name alone does not match the file rule; other ids whole
+    node_id = str(node_id)
+    return node_id.rsplit(":", 2)[0] if node_id.startswith("code:") else node_id
+
+def is_critical(label, node_id):
+    return critical_names.search(label) or critical_files.search(_file_part(node_id))
+
+def _search_distinct(values, matcher):
+    # matcher.search per value, each distinct value scanned once (as label.text_mask does)
+    if PANDAS_OK:
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=False)
+    else:
+        table = {}
+        codes = np.fromiter((table.setdefault(v, len(table)) for v in values), dtype=np.int64)
+        uniques = list(table)
+    hit = np.fromiter((matcher.search(u) for u in uniques), dtype=bool, count=len(uniques))
+    return hit[codes]
+
+def critical_mask(labels, ids):
+    """is_critical for many rows at once; labels and files repeat, so each distinct one is scanned once."""
+    return _search_distinct(labels, critical_names) | _search_distinct(list(map(_file_part, ids)), critical_files)
+
+def feature_matrix(rows):
+    """FEATURE_COLS matrix of feature rows (missing features are 0)."""
+    try:
+        return np.fromiter(map(_feature_getter, rows), dtype=(float, len(FEATURE_COLS)), count=len(rows))
+    except (KeyError, TypeError, ValueError):
+        return np.array([[r.get(c, 0) for c in FEATURE_COLS] for r in rows], dtype=float)
+
 def compute_triviality(r):
     loc_n = r.get("loc_norm", 0.0)
     comp_n = r.get("complexity_norm", 0.0)
@@ -192,13 +782,7 @@ def compute_triviality(r):
         score = min(1.0, score + 0.10)
 
     # --- NEW: protect short but important core logic ---
-    name = str(r.get("label", "")).lower()
-    file_id = str(r.get("id", "")).lower()
-
-    critical_names = ["__init__", "decorator", "on_event", "setup", "configure", "mount"]
-    critical_files = ["applications", "routing", "endpoints", "schemas", "models"]
-
-    if any(k in name for k in critical_names) or any(f in file_id for f in critical_files):
+    if is_critical(r.get("label", ""), r.get("id", "")):
         # these are often core even if short → lower triviality
         score = max(0.0, score - 0.15)
 
@@ -209,21 +793,284 @@ def compute_triviality(r):
 
     return max(0.0, min(1.0, float(score)))
 
-for r in rows:
-    r["triviality"] = round(compute_triviality(r), 4)
-    r["importance"] = round(1.0 - r["triviality"], 4)
+def min_max_columns(X, lo=None, hi=None):
+    """Column-wise min-max scaling (optionally against given bounds); constant columns become 0."""
+    mn = X.min(axis=0) if lo is None else lo
+    span = (X.max(axis=0) if hi is None else hi) - mn
+    flat = np.abs(span) < 1e-12
+    out = (X - mn) / np.where(flat, 1.0, span)
+    out[:, flat] = 0.0
+    return out
+
+def triviality_matrix(X, critical, bounds=None):
+    """Vectorized compute_triviality: X has FEATURE_COLS columns, critical is a bool mask.
+
+    bounds ({col: (min, max)}) normalizes against global extremes instead of X's own.
+    Returns (triviality, normalized numeric_cols matrix).
+    """
+    col = {c: X[:, k] for k, c in enumerate(FEATURE_COLS)}
+    lo = np.array([bounds[c][0] for c in numeric_cols], dtype=float) if bounds else None
+    hi = np.array([bounds[c][1] for c in numeric_cols], dtype=float) if bounds else None
+    N = min_max_columns(X[:, [FEATURE_COLS.index(c) for c in numeric_cols]], lo, hi)
+    w = np.array([weights.get(f"{c}_norm", 0.0) for c in numeric_cols])
+    # keyword density counts towards triviality; every other feature counts against it
+    direct = np.array([c == "keyword_matches" for c in numeric_cols])
+    score = np.where(direct, N, 1.0 - N) @ w
+
+    one_liner = (col["one_liner"] != 0) & (col["num_calls"] <= 1) & (col["complexity"] <= 2)
+    score = np.where(one_liner, np.minimum(1.0, score + 0.10), score)
+    score = np.where(critical, np.maximum(0.0, score - 0.15), score)
+    designed = (col["has_type_annotations"] != 0) | (col["doc_len"] > 80)
+    score = np.where(designed, np.maximum(0.0, score - 0.08), score)
+    return np.clip(score, 0.0, 1.0), N
+
+def score_rows(rows, bounds=None):
+    """Add *_norm, triviality and importance to feature rows in place; returns triviality.
+
+    Pass bounds from column_bounds to score one chunk of a larger set consistently.
+    """
+    if NUMPY_OK and rows:
+        X = feature_matrix(rows)
+        critical = critical_mask([r.get("label", "") for r in rows], [r.get("id", "") for r in rows])
+        triv, N = triviality_matrix(X, critical, bounds)
+        for r, t, n in zip(rows, triv.tolist(), N.tolist()):
+            r.update(zip([f"{c}_norm" for c in numeric_cols], n))
+            r["triviality"] = round(t, 4)
+            r["importance"] = round(1.0 - r["triviality"], 4)
+    else:
+        normalize_rows(rows, bounds)
+        for r in rows:
+            r["triviality"] = round(compute_triviality(r), 4)
+            r["importance"] = round(1.0 - r["triviality"], 4)
+    return [r["triviality"] for r in rows]
+
+class FunctionRanker:
+    """In-process ranking API, so other tools can rank nodes without the CSV/JSON round trip.
+
+        ranker = FunctionRanker(workers=4)
+        rows = ranker.extract(nodes)    # feature rows, in input order
+        triv = ranker.score(rows)       # triviality per row
+        for row in ranker.rank():       # rows by importance, most important first
+            ...
+    """
+
+    def __init__(self, workers=1, cache=None, previous=None, batch_size=STREAM_BATCH, fast=False, graph=None,
+                 code_source=None, synth_calls=False, parents=None):
+        self.workers = workers
+        self.fast = fast
+        self.graph = graph      # GraphFeatures adding its columns to every row, or None
+        # with synth_calls, the rows' own call targets become the call graph once all are extracted
+        self.call_sites = CallSites() if synth_calls and GRAPH_OK else None
+        # GraphIndex whose row_code() resolves "_code_row" references of lazy snapshot nodes
+        self.code_source = code_source
+        # {node id: container id} from the graph's contains edges, for parse reuse (or None)
+        self.parents = parents
+        # MinHash signatures of every extracted row, in order, for clone_group_size
+        self.clones = CloneIndex() if CLONES_OK else None
+        self.cache = cache
+        self.previous = previous
+        self.batch_size = batch_size
+        self.rows = []
+        self.counts = Counter()
+        self.seen_ids = set()
+        self._scored = False
+
+    def iter_extract(self, nodes):
+        """Yield feature rows batch by batch without keeping them (see rank_out_of_core)."""
+        pool = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        try:
+            for batch in iter_batches(nodes, self.batch_size):
+                # counted as read, so a node lost on the way shows up in check_counts
+                self.counts["input"] += len(batch)
+                # lazy nodes get their code for extraction only; rows keep just the reference
+                batch = [self.materialize(n) for n in batch]
+                rows = extract_rows(batch, workers=self.workers, parents=self.parents, cache=self.cache,
+                                    previous=self.previous, pool=pool, counts=self.counts, fast=self.fast)
+                for r in rows:
+                    if "_code_row" in r:
+                        r["code"] = None
+                if self.graph is not None:
+                    self.graph.annotate(rows)
+                if self.clones is not None:
+                    self.clones.add(r.get(SIG_COL, "") for r in rows)
+                if self.call_sites is not None:
+                    self.call_sites.add(rows)
+                yield rows
+                if self.previous:
+                    self.seen_ids.update(n.get("id") for n in batch if isinstance(n, dict))
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    def clone_sizes(self):
+        """Clone group size of every row extracted so far, in order (None without clones.py)."""
+        return self.clones.group_sizes() if self.clones is not None else None
+
+    def synthesized_graph(self):
+        """GraphFeatures over the call edges resolved among every row extracted so far, or None."""
+        if self.call_sites is None:
+            return None
+        edges = self.call_sites.edges()
+        self.counts["call_edges"] = len(edges)
+        return GraphFeatures.from_edges(edges, self.call_sites.ids)
+
+    def materialize(self, row):
+        """row (or node) with its code decoded, if it only holds a "_code_row" reference; else row itself."""
+        if self.code_source is None or not isinstance(row, dict) or "_code_row" not in row:
+            return row
+        out = dict(row)     # same key order, so "code" lands where the input had it
+        out["code"] = self.code_source.row_code(out.pop("_code_row"))
+        return out
+
+    def extract(self, nodes):
+        """Extract feature rows for an iterable of nodes (consumed in batches); returns the new rows."""
+        new_rows = [r for batch in self.iter_extract(nodes) for r in batch]
+        self.rows.extend(new_rows)
+        # new rows can join the groups of earlier ones, so every row is re-annotated
+        sizes = self.clone_sizes()
+        if sizes is not None:
+            for r, n in zip(self.rows, sizes.tolist()):
+                r["clone_group_size"] = n
+        # a call can resolve to a row of a later batch, so edges wait for the whole input
+        synthesized = self.synthesized_graph()
+        if synthesized is not None:
+            synthesized.annotate(self.rows)
+        self._scored = False
+        return new_rows
+
+    def score(self, features, labels=None, ids=None):
+        """Triviality for feature rows (dicts, annotated in place) or for a FEATURE_COLS matrix.
+
+        A matrix is an array or any sequence of per-row sequences; labels/ids feed its
+        critical-name rule and the result is unrounded.
+        """
+        if not hasattr(features, "__len__"):
+            features = list(features)   # a generator of either kind, told apart by its first element
+        first = next(iter(features), None)
+        if NUMPY_OK and (isinstance(features, np.ndarray) or (first is not None and not isinstance(first, dict))):
+            X = np.asarray(features, dtype=float)
+            n = X.shape[0]
+            if not n:
+                return np.zeros(0)
+            labels = labels if labels is not None else [""] * n
+            ids = ids if ids is not None else [""] * n
+            critical = critical_mask(labels, ids)
+            return triviality_matrix(X, critical)[0]
+        triv = score_rows(features)
+        return np.array(triv) if NUMPY_OK else triv
+
+    def rank_order(self):
+        """Input positions of self.rows by importance, descending (scores rows if needed)."""
+        if not self._scored:
+            score_rows(self.rows)
+            self._scored = True
+        return sorted(range(len(self.rows)), key=lambda i: self.rows[i].get("importance", 0.0), reverse=True)
+
+    def rank(self, nodes=None):
+        """Iterate rows by importance, descending; extracts nodes first if given."""
+        if nodes is not None:
+            self.extract(nodes)
+        return (self.rows[i] for i in self.rank_order())
+
+def lean_row(row, input_index):
+    """Project a ranked row to ids, features and scores; code is referenced, not copied."""
+    out = {
+        "id": row.get("id"),
+        "label": row.get("label", ""),
+        "input_index": input_index,
+        "code_digest": code_digest(_code_of(row)),
+    }
+    out.update((c, row.get(c)) for c in EXTRACTED_COLS + CLONE_COLS)
+    out.update((f"{c}_norm", row.get(f"{c}_norm")) for c in numeric_cols)
+    if GRAPH_OK:
+        out.update((c, row[c]) for c in row if c in GRAPH_COLS or c.startswith("ppr_"))
+    out["triviality"] = row.get("triviality")
+    out["importance"] = row.get("importance")
+    return out
+
+def _read_jsonl(path):
+    with Path(path).open("r", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
 
-# Sort by importance descending for output
-rows_sorted = sorted(rows, key=lambda x: x.get("importance", 0.0), reverse=True)
+def _spill_code(row, f):
+    """Move row's code text to f, leaving "_spill": [offset, length]; the snippet is rebuilt from it later."""
+    code = row.get("code")
+    if isinstance(code, str) and code:
+        data = code.encode("utf-8")
+        row["_spill"] = [f.tell(), len(data)]
+        f.write(data)
+        row["code"] = None
+    if "_spill" in row or "_code_row" in row:
+        row["code_snippet"] = None      # key kept, so the restored row has its original key order
+    return row
 
-# Ensure output folder exists
-OUT_CSV.parent.mkdir(parents=True, exist_ok=True)
+def _unspill_code(row, f, materialize):
+    span = row.pop("_spill", None)
+    if span is not None:
+        f.seek(span[0])
+        row["code"] = f.read(span[1]).decode("utf-8")
+    row = materialize(row)
+    if "code_snippet" in row and row["code_snippet"] is None:
+        row["code_snippet"] = code_snippet(row.get("code"))
+    return row
 
-# Write JSON (full rows_sorted)
-OUT_JSON.write_text(json.dumps({"function_rankings": rows_sorted}, indent=2), encoding="utf-8")
-print(f"[+] Written JSON to: {OUT_JSON}")
+def _iter_runs(path, run_bytes):
+    """(input_index, row) lists read from a spill file, each about run_bytes of its JSON."""
+    chunk, size = [], 0
+    with Path(path).open("r", encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            chunk.append((i, json.loads(line)))
+            size += len(line)
+            if size >= run_bytes:
+                yield chunk
+                chunk, size = [], 0
+    if chunk:
+        yield chunk
+
+def rank_out_of_core(ranker, nodes, spill_dir=None, run_bytes=OOC_RUN_BYTES):
+    """Two-pass ranking in bounded memory; yields (input_index, row) by importance, descending.
+
+    Pass one streams feature rows to a spill file while folding per-column min/max (and
+    clone signatures into ranker.clones, call targets into ranker.call_sites). Code text
+    goes to a separate file, so spilled rows hold features plus a reference. Pass two
+    adds clone_group_size and any synthesized call-graph columns, scores the spill
+    run_bytes at a time against those global bounds, writes each run sorted, and the
+    runs are merged (external merge sort); code is read back only as rows are yielded.
+    Ties keep input order, so the ranking matches FunctionRanker.rank().
+    """
+    with tempfile.TemporaryDirectory(prefix="rank_spill_", dir=spill_dir) as tmp:
+        spill = Path(tmp) / "features.jsonl"
+        code_file = Path(tmp) / "code.bin"
+        bounds = {}
+        start = len(ranker.clones) if ranker.clones is not None else 0
+        with spill.open("w", encoding="utf-8") as f, code_file.open("wb") as cf:
+            for batch in ranker.iter_extract(nodes):
+                bounds = column_bounds(batch, bounds)
+                f.writelines(json.dumps(_spill_code(r, cf)) + "\n" for r in batch)
+        sizes = ranker.clone_sizes()
+        synthesized = ranker.synthesized_graph()
+
+        runs = []
+        for chunk in _iter_runs(spill, run_bytes):
+            if sizes is not None:
+                for i, r in chunk:
+                    r["clone_group_size"] = int(sizes[start + i])
+            if synthesized is not None:
+                synthesized.annotate([r for _, r in chunk])
+            score_rows([r for _, r in chunk], bounds)
+            chunk.sort(key=lambda t: (-t[1]["importance"], t[0]))
+            run = Path(tmp) / f"run_{len(runs):05d}.jsonl"
+            with run.open("w", encoding="utf-8") as f:
+                f.writelines(json.dumps(t) + "\n" for t in chunk)
+            runs.append(run)
+        spill.unlink()
+
+        merged = heapq.merge(*[_read_jsonl(r) for r in runs], key=lambda t: (-t[1]["importance"], t[0]))
+        with code_file.open("rb") as cf:
+            for i, row in merged:
+                yield i, _unspill_code(row, cf, ranker.materialize)
 
-# Write CSV
 csv_columns = [
     # include original fields 'id' and 'label' first, then core numeric fields
     "id", "label", "importance", "triviality",
@@ -232,35 +1079,203 @@ csv_columns = [
     "doc_len", "keyword_matches", "one_liner", "has_type_annotations"
 ]
 
-if PANDAS_OK:
-    import pandas as pd
-    df = pd.DataFrame(rows_sorted)
-    # try to reorder columns to csv_columns if available
-    cols_present = [c for c in csv_columns if c in df.columns]
-    df.to_csv(OUT_CSV, index=False, columns=cols_present)
-    print(f"[+] Written CSV to: {OUT_CSV} (using pandas)")
-else:
+def _write_full_json(f, rows, version):
+    # laid out exactly as json.dumps({"extractor_version": ..., "function_rankings": rows}, indent=2)
+    f.write('{\n  "extractor_version": %s,\n  "function_rankings": [' % json.dumps(version))
+    n = 0
+    for row in rows:
+        f.write(("," if n else "") + "\n" + textwrap.indent(json.dumps(row, indent=2), "    "))
+        n += 1
+    f.write("\n  ]\n}" if n else "]\n}")
+
+def write_outputs(rows_sorted, json_rows=None, input_path=INPUT, version=EXTRACTOR_VERSION, columns=csv_columns,
+                  materialize=None):
+    """Write JSON, CSV and feature store; json_rows (lean projection) replaces the full JSON rows.
+
+    materialize, if given, maps a row to the one written to the full JSON (e.g.
+    FunctionRanker.materialize); it is applied one row at a time while writing.
+    """
+    # Ensure output folder exists
+    OUT_CSV.parent.mkdir(parents=True, exist_ok=True)
+
+    if json_rows is None:
+        # Write JSON (full rows_sorted), one row in memory at a time
+        with OUT_JSON.open("w", encoding="utf-8") as f:
+            _write_full_json(f, map(materialize, rows_sorted) if materialize else rows_sorted, version)
+    else:
+        out = {"extractor_version": version, "input": str(input_path), "function_rankings": json_rows}
+        OUT_JSON.write_text(json.dumps(out, separators=(",", ":")), encoding="utf-8")
+    print(f"[+] Written JSON to: {OUT_JSON}{' (lean)' if json_rows is not None else ''}")
+
+    # Write CSV
+    if PANDAS_OK:
+        df = pd.DataFrame(rows_sorted)
+        # try to reorder columns to the requested order if available
+        cols_present = [c for c in columns if c in df.columns]
+        df.to_csv(OUT_CSV, index=False, columns=cols_present)
+        print(f"[+] Written CSV to: {OUT_CSV} (using pandas)")
+    else:
+        import csv
+        with OUT_CSV.open("w", newline="", encoding="utf-8") as cf:
+            writer = csv.DictWriter(cf, fieldnames=[c for c in columns])
+            writer.writeheader()
+            for r in rows_sorted:
+                writer.writerow({c: r.get(c, "") for c in columns})
+        print(f"[+] Written CSV to: {OUT_CSV} (using csv)")
+
+    # Written last: ml.py / report.py memory-map this store when it is newer than the CSV
+    if NUMPY_OK:
+        from feature_store import write_store
+        store = write_store(rows_sorted, columns)
+        print(f"[+] Written feature store to: {store}")
+
+def write_outputs_streaming(ranked, lean=False, input_path=INPUT, version=EXTRACTOR_VERSION, columns=csv_columns):
+    """Write JSON and CSV row by row from an iterator of (input_index, row); returns the row count.
+
+    The full JSON is laid out exactly as json.dumps(..., indent=2) would. No feature store is
+    written, so ml.py / report.py fall back to the (newer) CSV.
+    """
     import csv
-    with OUT_CSV.open("w", newline="", encoding="utf-8") as cf:
-        writer = csv.DictWriter(cf, fieldnames=[c for c in csv_columns])
+    OUT_CSV.parent.mkdir(parents=True, exist_ok=True)
+    n = 0
+    with OUT_JSON.open("w", encoding="utf-8") as jf, OUT_CSV.open("w", newline="", encoding="utf-8") as cf:
+        writer = csv.DictWriter(cf, fieldnames=columns, extrasaction="ignore", lineterminator="\n")
         writer.writeheader()
-        for r in rows_sorted:
-            writer.writerow({c: r.get(c, "") for c in csv_columns})
-    print(f"[+] Written CSV to: {OUT_CSV} (using csv)")
+        if lean:
+            head = {"extractor_version": version, "input": str(input_path)}
+            jf.write(json.dumps(head, separators=(",", ":"))[:-1] + ',"function_rankings":[')
+        else:
+            jf.write('{\n  "extractor_version": %s,\n  "function_rankings": [' % json.dumps(version))
+        for i, row in ranked:
+            if lean:
+                jf.write(("," if n else "") + json.dumps(lean_row(row, i), separators=(",", ":")))
+            else:
+                jf.write(("," if n else "") + "\n" + textwrap.indent(json.dumps(row, indent=2), "    "))
+            writer.writerow({c: row.get(c, "") for c in columns})
+            n += 1
+        jf.write("]}" if lean else ("\n  ]\n}" if n else "]\n}"))
+    print(f"[+] Written JSON to: {OUT_JSON}{' (lean)' if lean else ''}")
+    print(f"[+] Written CSV to: {OUT_CSV} (using csv, streamed)")
+    return n
 
-# Final sanity check: counts
-out_rows_count = 0
-try:
-    with OUT_CSV.open("r", encoding="utf-8") as f:
-        out_rows_count = len(f.read().splitlines()) - 1  # minus header
-except Exception:
-    out_rows_count = len(rows_sorted)
+def check_counts(n_input, rows_sorted):
+    # Final sanity check: counts
+    out_rows_count = 0
+    try:
+        with OUT_CSV.open("r", encoding="utf-8") as f:
+            out_rows_count = sum(1 for _ in f) - 1  # minus header
+    except Exception:
+        out_rows_count = len(rows_sorted)
+
+    print(f"[+] Input nodes: {n_input}")
+    print(f"[+] Output CSV rows: {out_rows_count}")
+    if n_input != out_rows_count:
+        print("WARNING: counts differ! Make sure no rows were dropped.", file=sys.stderr)
+    else:
+        print("[+] Counts match. All nodes preserved.")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", default=str(INPUT), help=f"Analysis JSON with graphNodes (default {INPUT})")
+    parser.add_argument("--workers", type=int, default=1, help="Extract features in N worker processes (default 1 = serial)")
+    parser.add_argument("--cache", default=str(CACHE_DB), help=f"Feature cache database (default {CACHE_DB})")
+    parser.add_argument("--cache-size", type=int, default=500_000, help="Max cached feature vectors before LRU eviction")
+    parser.add_argument("--no-cache", action="store_true", help="Always re-extract features, ignoring the cache")
+    parser.add_argument("--fast", action="store_true", help="Skip ast.parse; approximate every node's features from one lexical token scan")
+    parser.add_argument("--lean", action="store_true", help="Write only ids, features and scores to the JSON (code referenced by input_index)")
+    parser.add_argument("--out-of-core", action="store_true", help="Rank in constant memory via a spill file and external merge sort")
+    parser.add_argument("--spill-dir", help="Directory for --out-of-core temporary files (default: system temp)")
+    parser.add_argument("--since", metavar="PREVIOUS_JSON", help="Reuse features of unchanged nodes from an earlier ranked_functions.json")
+    parser.add_argument("--graph", default=str(ANALYSIS) if GRAPH_OK else None, help="Analysis JSON whose graphEdges give degree/PageRank columns (default core/data/analysis.json)")
+    parser.add_argument("--no-graph", action="store_true", help="Skip the call-graph feature columns")
+    parser.add_argument("--synth-calls", action="store_true",
+                        help="Build the call graph from the input's code instead of --graph (automatic when that file is missing)")
+    parser.add_argument("--seed-groups", choices=["c1Output", "c2Subcategories"],
+                        help="Add a personalized PageRank column (ppr_*) per category of the graph file")
+    args = parser.parse_args()
+
+    input_path = Path(args.input)
+    if not input_path.exists():
+        print(f"ERROR: input file not found at {input_path}", file=sys.stderr)
+        sys.exit(1)
+
+    version = extractor_version(args.fast)
+    previous = load_previous_features(args.since, version) if args.since else None
+
+    cache = None
+    if not args.no_cache:
+        cache = FeatureCache(args.cache, version=version, max_entries=args.cache_size)
+
+    graph = None
+    columns = csv_columns + CLONE_COLS
+    nodes = None
+    code_source = None
+    snapshot = None
+    synth_calls = GRAPH_OK and not args.no_graph and (args.synth_calls or not (args.graph and Path(args.graph).exists()))
+    if synth_calls:
+        # one input file, one parse: call edges come from the call targets extraction records
+        columns = columns + GRAPH_COLS
+        if args.seed_groups:
+            print("[!] --seed-groups is ignored with synthesized call edges (no categories)")
+        print(f"[+] Call-graph features from call edges synthesized from {input_path}")
+    elif GRAPH_OK and not args.no_graph and args.graph and Path(args.graph).exists():
+        # one snapshot of the graph file fused with the input's code; later runs just map it
+        snapshot = GraphIndex.open(args.graph, code_path=input_path)
+        graph = GraphFeatures.from_index(snapshot, seed_groups=args.seed_groups)
+        columns = columns + graph.names
+        print(f"[+] Call-graph features from {args.graph} ({len(graph.index)} nodes)")
+        if snapshot.has_code:
+            # code stays in the mapped snapshot until extraction or output needs it
+            nodes = snapshot.nodes(lazy=True)
+            code_source = snapshot
+            print(f"[+] Reading nodes from snapshot {snapshot.path}. Processing...")
+    if nodes is None:
+        nodes = iter_graph_nodes(input_path)
+        print(f"[+] Streaming nodes from {input_path}. Processing...")
+
+    ranker = FunctionRanker(workers=args.workers, cache=cache, previous=previous, fast=args.fast, graph=graph,
+                            code_source=code_source, synth_calls=synth_calls,
+                            parents=snapshot.parents("contains") if snapshot is not None else None)
+    if args.out_of_core:
+        ranked = rank_out_of_core(ranker, nodes, spill_dir=args.spill_dir)
+        write_outputs_streaming(ranked, lean=args.lean, input_path=input_path, version=version, columns=columns)
+        print(f"[+] Found {ranker.counts['input']} nodes in input JSON.")
+    else:
+        ranker.extract(nodes)
+        print(f"[+] Found {ranker.counts['input']} nodes in input JSON.")
+
+    if previous:
+        removed = sum(1 for k in previous if k not in ranker.seen_ids)
+        counts = ranker.counts
+        print(f"[+] Incremental: {counts['unchanged']} unchanged, {counts['changed']} changed, "
+              f"{counts['added']} added, {removed} removed")
+    if ranker.clones is not None:
+        groups = ranker.clones.clusters()
+        print(f"[+] Clone groups: {len(groups)} near-duplicate groups covering {sum(map(len, groups))} nodes")
+    if ranker.call_sites is not None:
+        print(f"[+] Synthesized {ranker.counts['call_edges']} call edges among {len(ranker.call_sites.ids)} nodes")
+    if ranker.counts["shared_body"]:
+        print(f"[+] Duplicate bodies: {ranker.counts['shared_body']} nodes reused features of an identical body")
+    if cache is not None:
+        print(f"[+] Feature cache: {cache.stats()}")
+        cache.close()
+
+    if not args.out_of_core:
+        order = ranker.rank_order()
+        rows_sorted = [ranker.rows[i] for i in order]
+        json_rows = [lean_row(ranker.materialize(ranker.rows[i]), i) for i in order] if args.lean else None
+        write_outputs(rows_sorted, json_rows=json_rows, input_path=input_path, version=version, columns=columns,
+                      materialize=ranker.materialize)
+    if snapshot is not None and PANDAS_OK:
+        # the graph file's categories are at hand, so their rankings are refreshed with the scores
+        from categories import write_category_rankings
+        from rollup import load_scores
+        categories_path = write_category_rankings(load_scores(), snapshot)
+        if categories_path is not None:
+            print(f"[+] Written category rankings to: {categories_path}")
+    check_counts(ranker.counts["input"], [])
 
-print(f"[+] Input nodes: {len(nodes)}")
-print(f"[+] Output CSV rows: {out_rows_count}")
-if len(nodes) != out_rows_count:
-    print("WARNING: counts differ! Make sure no rows were dropped.", file=sys.stderr)
-else:
-    print("[+] Counts match. All nodes preserved.")
+    print("[+] Done.")
 
-print("[+] Done.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
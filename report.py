@@ -6,6 +6,9 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from feature_store import load_frame, store_is_fresh
+from categories import OUT_JSON as CATEGORIES_JSON, load_summaries, rankings_are_fresh
+
 # Paths
 DATA_DIR = Path("core/data")
 CSV_HEURISTIC = DATA_DIR / "ranked_functions_scores.csv"
@@ -13,10 +16,13 @@ CSV_ML = DATA_DIR / "ranked_functions_ml.csv"
 OUT_HTML = DATA_DIR / "ranked_functions_report.html"
 
 # ---------- Load data ----------
-if not CSV_HEURISTIC.exists():
+if store_is_fresh(CSV_HEURISTIC):
+    # memory-mapped columnar store written by rank_func.py
+    df = load_frame()
+elif not CSV_HEURISTIC.exists():
     raise FileNotFoundError("Missing ranked_functions_scores.csv — run rank_functions.py first.")
-
-df = pd.read_csv(CSV_HEURISTIC)
+else:
+    df = pd.read_csv(CSV_HEURISTIC)
 has_ml = CSV_ML.exists()
 if has_ml:
     df_ml = pd.read_csv(CSV_ML)
@@ -80,6 +86,16 @@ main_html = df.to_html(classes="display nowrap compact", index=False, table_id="
 top_html = df_html(top_df)
 bottom_html = df_html(bottom_df)
 
+# per-category summaries are precomputed by rank_func.py / categories.py, so no node rows are
+# regrouped here; summaries older than the scores belong to an earlier ranking and are left out
+category_html = ""
+if rankings_are_fresh(CSV_HEURISTIC, CATEGORIES_JSON):
+    cat_df = load_summaries(CATEGORIES_JSON)
+    if not cat_df.empty:
+        cols = ["category", "n_nodes", "n_scored", "importance_mean", "importance_max",
+                "importance_sum", "trivial_share"]
+        category_html = "<h3>Categories</h3>\n" + df_html(cat_df[cols])
+
 # ---------- Build HTML ----------
 html = f"""<!DOCTYPE html>
 <html>
@@ -113,6 +129,8 @@ summary,details {{ margin-bottom: 8px; }}
 {f'<img class="plot" src="data:image/png;base64,{scatter_b64}" alt="Heuristic vs ML scatter">' if has_ml else ""}
 {f'<img class="plot" src="data:image/png;base64,{corr_b64}" alt="Correlation heatmap">' if corr_b64 else ""}
 
+{category_html}
+
 <h3>Interactive Table (All Functions)</h3>
 <p>You can search, sort, and filter columns.</p>
 <table id="main_table" class="display nowrap compact" style="width:100%">
@@ -0,0 +1,76 @@
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from feature_store import load_frame, store_is_fresh
+from graph import ANALYSIS, CallGraph
+
+ROOT = Path(".")
+CSV_IN = ROOT / "core" / "data" / "ranked_functions_scores.csv"
+OUT_CSV = ROOT / "core" / "data" / "ranked_rollup.csv"
+
+# containment levels, outermost first; code nodes that contain code are classes (or enclosing defs)
+LEVELS = ["workspace", "folder", "file", "class"]
+AGGREGATES = {"max": "importance_max", "mean": "importance_mean", "sum": "importance_sum",
+              "weighted": "importance_loc_weighted"}
+
+def load_scores():
+    # prefer the memory-mapped columnar store written by rank_func.py
+    if store_is_fresh(CSV_IN):
+        return load_frame()
+    if not CSV_IN.exists():
+        raise FileNotFoundError(f"{CSV_IN} not found. Run rank_func.py first.")
+    return pd.read_csv(CSV_IN)
+
+def level_of(node_id):
+    kind = str(node_id).split(":", 1)[0]
+    return "class" if kind == "code" else kind
+
+def rollup_frame(graph, scores):
+    """One row per containing node: its subtree's symbol count and importance aggregates."""
+    ids = pd.Series(graph.ids)
+    scored = scores.assign(id=scores["id"].astype(str)).drop_duplicates("id").set_index("id")
+    # only code symbols carry importance; folder/file nodes are NaN so they do not count
+    is_code = ids.str.startswith("code:").to_numpy()
+    importance = scored["importance"].reindex(ids).to_numpy(dtype=float)
+    loc = scored["loc"].reindex(ids).fillna(0).to_numpy(dtype=float) if "loc" in scored else None
+    agg = graph.rollup(np.where(is_code, importance, np.nan), loc)
+
+    parent, depth = graph.containment()
+    n_children = np.bincount(parent[parent >= 0], minlength=len(graph))
+    out = pd.DataFrame({
+        "id": ids,
+        "level": ids.map(level_of),
+        "parent": [graph.ids[p] if p >= 0 else "" for p in parent],
+        "depth": depth,
+        "n_children": n_children,
+        "n_symbols": agg["count"].astype(int),
+    })
+    for key, col in AGGREGATES.items():
+        out[col] = np.round(agg[key], 6)
+    return out[n_children > 0].reset_index(drop=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Roll node importance up the containment tree")
+    parser.add_argument("--graph", default=str(ANALYSIS), help=f"Analysis JSON with contains edges (default {ANALYSIS})")
+    parser.add_argument("--by", choices=list(AGGREGATES), default="max", help="Aggregate to rank parents by (default max)")
+    parser.add_argument("--top", type=int, default=10, help="Files to print (default 10)")
+    args = parser.parse_args()
+
+    out = rollup_frame(CallGraph.load(args.graph), load_scores())
+    key = AGGREGATES[args.by]
+    out["level_order"] = out["level"].map({lvl: k for k, lvl in enumerate(LEVELS)}).fillna(len(LEVELS))
+    out = out.sort_values(["level_order", key], ascending=[True, False], kind="stable").drop(columns="level_order")
+    OUT_CSV.parent.mkdir(parents=True, exist_ok=True)
+    out.to_csv(OUT_CSV, index=False)
+    print(f"[+] Rolled up {len(out)} containing nodes ({', '.join(f'{n} {lvl}' for lvl, n in out['level'].value_counts().items())})")
+    print(f"[+] Written CSV to: {OUT_CSV}")
+
+    print(f"\nTop {args.top} files by {key}:")
+    files = out[out["level"] == "file"].head(args.top)
+    print(files[["id", "n_symbols", key]].to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# the pipeline's modules sit at the repository root, next to core/data
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
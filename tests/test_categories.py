@@ -0,0 +1,18 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from categories import _records, category_rankings
+
+def test_records_write_missing_values_as_null():
+    members = pd.DataFrame({"category_id": ["c1", "c1", "c2"], "category": ["A", "A", "B"],
+                            "parent_id": ["", "", ""], "id": ["x", "y", "z"]})
+    # a blank label read back from the scores CSV is NaN
+    scores = pd.DataFrame({"id": ["x", "y"], "label": [np.nan, "g"], "importance": [0.5, 0.9],
+                           "triviality": [0.1, np.nan]})
+    records = _records(*category_rankings(scores, members))
+    text = json.dumps(records, allow_nan=False)
+    by_id = {r["category_id"]: r for r in json.loads(text)}
+    assert [(t["id"], t["label"], t["rank"]) for t in by_id["c1"]["top"]] == [("y", "g", 1), ("x", None, 2)]
+    assert by_id["c2"]["importance_mean"] is None and by_id["c2"]["top"] == []
@@ -0,0 +1,47 @@
+import random
+
+import numpy as np
+
+from clones import MIN_SHINGLES, SHINGLE, CloneIndex, clone_signature
+
+TOKENS = ["FunctionDef", "arguments", "arg", "Return", "Call", "Name", "Attribute", "Assign",
+          "If", "Compare", "For", "BinOp", "Constant", "Expr", "With", "Try"]
+
+def shape(seed, length=40):
+    rng = random.Random(seed)
+    return [rng.choice(TOKENS) for _ in range(length)]
+
+def test_small_bodies_have_no_signature():
+    assert clone_signature(shape(0, MIN_SHINGLES + SHINGLE - 2)) == ""
+    assert clone_signature([]) == ""
+    assert len(clone_signature(shape(0))) == 8 * 32
+
+def test_no_signatures():
+    index = CloneIndex()
+    index.add(["", ""])
+    index.add([""])
+    np.testing.assert_array_equal(index.labels(), [-1, -1, -1])
+    np.testing.assert_array_equal(index.group_sizes(), [1, 1, 1])
+    assert index.clusters() == []
+
+def test_empty_index():
+    index = CloneIndex()
+    assert len(index.labels()) == 0 and index.clusters() == []
+
+def test_single_signature():
+    index = CloneIndex()
+    index.add(["", clone_signature(shape(1)), ""])
+    np.testing.assert_array_equal(index.labels(), [-1, 0, -1])
+    np.testing.assert_array_equal(index.group_sizes(), [1, 1, 1])
+    assert index.clusters() == []
+
+def test_copies_group_together():
+    a, b = shape(2), shape(3)
+    near_a = a[:-1] + ["Expr"]      # one token changed at the end: most shingles shared
+    index = CloneIndex()
+    index.add([clone_signature(a), clone_signature(b), ""])
+    index.add([clone_signature(near_a), clone_signature(a)])
+    sizes = index.group_sizes()
+    assert sizes[[0, 3, 4]].tolist() == [3, 3, 3]
+    assert sizes[[1, 2]].tolist() == [1, 1]
+    assert [g.tolist() for g in index.clusters()] == [[0, 3, 4]]
@@ -0,0 +1,65 @@
+import random
+from pathlib import Path
+
+import pytest
+
+import keywords
+from keywords import DEFAULT_KEYWORDS, KeywordMatcher, _is_word
+from loader import iter_graph_nodes
+
+DATA = Path(__file__).resolve().parent.parent / "core" / "data"
+
+# overlapping keywords, shared prefixes and suffixes, and one keyword inside another
+NESTED = ["he", "she", "his", "hers", "a", "ab", "bab", "abab", "_x", "x("]
+
+def brute_force(keyword_list, text, word_start=False):
+    text = str(text).lower()
+    hits = []
+    for k in dict.fromkeys(k.lower() for k in keyword_list if k):
+        start = text.find(k)
+        while start >= 0:
+            if not (word_start and start and _is_word(text[start - 1])):
+                hits.append((start, k))
+            start = text.find(k, start + 1)
+    return sorted(hits)
+
+def random_texts(n=200, seed=0):
+    rng = random.Random(seed)
+    alphabet = "abhersiX_( ."
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randrange(40))) for _ in range(n)]
+
+def sample_bodies():
+    return [n.get("code") or "" for n in iter_graph_nodes(DATA / "analysis-with-code.json")]
+
+@pytest.fixture
+def pure_python(monkeypatch):
+    monkeypatch.setattr(keywords, "AHOCORASICK_OK", False)
+
+@pytest.mark.parametrize("word_start", [False, True])
+def test_fallback_matches_brute_force(pure_python, word_start):
+    m = KeywordMatcher(NESTED + ["HE"], word_start=word_start)
+    for text in random_texts():
+        expected = brute_force(NESTED, text, word_start)
+        assert sorted(m.finditer(text)) == expected, text
+        assert m.count(text) == len({s for s, _ in expected})
+        assert m.search(text) == bool(expected)
+
+@pytest.mark.parametrize("word_start", [False, True])
+def test_fallback_matches_brute_force_on_sample(pure_python, word_start):
+    m = KeywordMatcher(DEFAULT_KEYWORDS["code"], word_start=word_start)
+    for code in sample_bodies():
+        assert sorted(m.finditer(code)) == brute_force(DEFAULT_KEYWORDS["code"], code, word_start)
+
+def test_word_start():
+    m = KeywordMatcher(["get", "is_"], word_start=True)
+    assert list(m.finditer("get(x) + forget() + obj.get + is_ok + this_is_")) == [(0, "get"), (24, "get"), (30, "is_")]
+    assert m.hits("This_is_") == []
+    assert KeywordMatcher([]).count("anything") == 0
+
+@pytest.mark.skipif(not keywords.AHOCORASICK_OK, reason="pyahocorasick not installed")
+def test_fallback_matches_c_automaton(monkeypatch):
+    texts = random_texts(seed=1) + sample_bodies()
+    lists = [NESTED, DEFAULT_KEYWORDS["code"], DEFAULT_KEYWORDS["util_names"]]
+    expected = [[sorted(KeywordMatcher(kw, word_start=True).finditer(t)) for t in texts] for kw in lists]
+    monkeypatch.setattr(keywords, "AHOCORASICK_OK", False)
+    assert [[sorted(KeywordMatcher(kw, word_start=True).finditer(t)) for t in texts] for kw in lists] == expected
@@ -0,0 +1,52 @@
+from pathlib import Path
+
+import pytest
+
+from loader import iter_graph_nodes
+from rank_func import FEATURE_COLS, extract_features, safe_parse
+
+DATA = Path(__file__).resolve().parent.parent / "core" / "data"
+
+SNIPPETS = {
+    "def": 'def f(a, b=1, *args, **kw):\n    """Doc."""\n    x = g(a)\n    if x and b or a:\n'
+           "        return h(x)\n    for i in range(3):\n        x += i\n    return x\n",
+    "async def": "async def f(a: int, b) -> int:\n    async with lock:\n        await g(a)\n    return a\n",
+    "class": 'class K(Base):\n    """Class doc."""\n    def m(self, x):\n        return self.n(x)\n\n'
+             "    def n(self, y) -> str:\n        return str(y)\n",
+    "comprehensions": "def f(xs):\n    return [x for x in xs if x > 0] + [y for y in xs]\n",
+    "lambda": "key = lambda a, b: a + b\n",
+    "try/import": "def f():\n    try:\n        import os\n        from x import y\n    except Exception:\n"
+                  "        pass\n    while True:\n        break\n",
+    "decorator": "@app.get('/x')\ndef route(req) -> dict:\n    return {'a': req.x}\n",
+    "annotated assign": "def f():\n    x: int = 3\n    return x\n",
+}
+
+def differing(code):
+    ast_feats, lex_feats = extract_features(code), extract_features(code, fast=True)
+    return {c: (ast_feats[c], lex_feats[c]) for c in FEATURE_COLS if ast_feats[c] != lex_feats[c]}
+
+@pytest.mark.parametrize("code", SNIPPETS.values(), ids=SNIPPETS.keys())
+def test_lexical_matches_ast(code):
+    assert safe_parse(code) is not None
+    assert differing(code) == {}
+
+def test_lexical_matches_ast_on_sample():
+    # the scan does not look inside f-strings, so their calls are the one known difference
+    checked = 0
+    for node in iter_graph_nodes(DATA / "analysis-with-code.json"):
+        code = node.get("code") or ""
+        if safe_parse(code) is None:
+            continue
+        checked += 1
+        diff = differing(code)
+        if diff and 'f"' in code:
+            diff.pop("num_calls", None)
+        assert diff == {}, node["id"]
+    assert checked > 100
+
+def test_unparsable_fragment_gets_lexical_features():
+    code = "def f(a, b) -> int:\n    return g(a) + h(b)\n)"
+    assert safe_parse(code) is None
+    feats = extract_features(code)
+    assert (feats["num_funcs"], feats["num_params"], feats["num_calls"], feats["num_returns"]) == (1, 2, 2, 1)
+    assert feats["has_type_annotations"] == 1
@@ -0,0 +1,83 @@
+import json
+from pathlib import Path
+
+import pytest
+
+import loader
+from loader import iter_json_arrays, iter_json_items, read_json_key
+
+DATA = Path(__file__).resolve().parent.parent / "core" / "data"
+NODES = ("analysisData", "graphNodes")
+
+DOC = {
+    "version": 3,
+    "skip": {"nested": [1, 2.5, {"x": "}]"}], "s": "a \"quoted\" ] value"},
+    "analysisData": {
+        "graphEdges": [{"source": "a", "target": "b"}],
+        "graphNodes": [
+            {"id": "code:a.py:f:1", "code": "def f():\n    return '\\u00e9'\n", "n": 12345678901234},
+            {"id": "code:a.py:g:9", "code": "x = [1, 2, 3]", "score": -0.125, "ok": True, "none": None},
+            "bare string",
+            42,
+            {"id": "unicode", "label": "caf\u00e9 \u2713", "empty": [], "obj": {}},
+        ],
+    },
+}
+
+@pytest.fixture
+def doc_path(tmp_path):
+    path = tmp_path / "doc.json"
+    path.write_text(json.dumps(DOC, indent=1, ensure_ascii=False), encoding="utf-8")
+    return path
+
+@pytest.fixture
+def scanner_only(monkeypatch):
+    # force the stdlib scanner, with a tiny read size so values straddle chunk edges
+    monkeypatch.setattr(loader, "IJSON_OK", False)
+    monkeypatch.setattr(loader, "CHUNK", 7)
+
+def test_scanner_yields_every_item(doc_path, scanner_only):
+    assert list(iter_json_items(doc_path, NODES)) == DOC["analysisData"]["graphNodes"]
+    assert list(iter_json_items(doc_path, ("analysisData", "graphEdges"))) == DOC["analysisData"]["graphEdges"]
+
+def test_scanner_missing_key_yields_nothing(doc_path, scanner_only):
+    assert list(iter_json_items(doc_path, ("analysisData", "c1Output"))) == []
+
+def test_scanner_empty_array(tmp_path, scanner_only):
+    path = tmp_path / "empty.json"
+    path.write_text('{"analysisData": {"graphNodes": [ ]}}', encoding="utf-8")
+    assert list(iter_json_items(path, NODES)) == []
+
+def test_arrays_in_one_scan(doc_path, scanner_only):
+    data = DOC["analysisData"]
+    got = list(iter_json_arrays(doc_path, ("analysisData",), ("graphNodes", "graphEdges", "missing")))
+    assert got == [("graphEdges", e) for e in data["graphEdges"]] + [("graphNodes", n) for n in data["graphNodes"]]
+    assert list(iter_json_arrays(doc_path, ("skip",), ("nested",))) == [("nested", v) for v in DOC["skip"]["nested"]]
+    assert list(iter_json_arrays(doc_path, ("nowhere",), ("graphNodes",))) == []
+
+def test_arrays_match_items_on_sample():
+    path = DATA / "analysis.json"
+    keys = ("graphNodes", "graphEdges", "c1Output", "c2Subcategories")
+    got = {key: [] for key in keys}
+    for key, item in iter_json_arrays(path, ("analysisData",), keys):
+        got[key].append(item)
+    assert got == {key: list(iter_json_items(path, ("analysisData", key))) for key in keys}
+
+def test_read_json_key(doc_path):
+    assert read_json_key(doc_path, "version") == 3
+    assert read_json_key(doc_path, "skip") == DOC["skip"]
+    assert read_json_key(doc_path, "missing") is None
+
+@pytest.mark.skipif(not loader.IJSON_OK, reason="ijson C backend not installed")
+def test_scanner_matches_ijson_on_sample(monkeypatch):
+    path = DATA / "analysis-with-code.json"
+    with_ijson = list(iter_json_items(path, NODES))
+    monkeypatch.setattr(loader, "IJSON_OK", False)
+    assert list(iter_json_items(path, NODES)) == with_ijson
+
+def test_scanner_matches_json_load_on_sample(monkeypatch):
+    path = DATA / "analysis.json"
+    expected = json.loads(path.read_text(encoding="utf-8"))["analysisData"]
+    monkeypatch.setattr(loader, "IJSON_OK", False)
+    for key in ("graphNodes", "graphEdges"):
+        assert list(iter_json_items(path, ("analysisData", key))) == expected[key]
@@ -0,0 +1,78 @@
+import random
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from graph import CallGraph, SeedRelevance, category_seeds
+from graph_index import GraphIndex
+
+DATA = Path(__file__).resolve().parent.parent / "core" / "data"
+
+def random_graph(seed, n=25):
+    """Call edges (duplicates included, some nodes dangling), plus extends and contains edges."""
+    rng = random.Random(seed)
+    ids = [f"n{i}" for i in range(n)]
+    edges = []
+    for label, m in (("call", 3 * n), ("extends", n // 3), (None, n)):
+        for _ in range(m):
+            s, t = rng.choice(ids[: n - 4]), rng.choice(ids)   # the last four never call out
+            edges.append({"source": s, "target": t, "label": label} if label else {"source": s, "target": t})
+    return CallGraph.from_edges(edges, ids)
+
+def dense_transition(graph, kinds):
+    """Column-stochastic W (dangling columns left zero) and the dangling mask, built densely."""
+    A = graph.matrix(kinds).toarray()
+    out = A.sum(axis=1)
+    dangling = out == 0
+    W = np.divide(A, out[:, None], out=np.zeros_like(A), where=~dangling[:, None]).T
+    return W, dangling.astype(np.float64)
+
+@pytest.mark.parametrize("seed", range(4))
+def test_pagerank_matches_closed_form(seed):
+    graph, d = random_graph(seed), 0.85
+    n = len(graph)
+    W, dangling = dense_transition(graph, ("calls", "extends"))
+    # r = d (W + 1/n 1 danglingᵀ) r + (1 - d)/n 1
+    expected = np.linalg.solve(np.eye(n) - d * (W + np.outer(np.ones(n) / n, dangling)), np.full(n, (1 - d) / n))
+    np.testing.assert_allclose(graph.pagerank(damping=d), expected, rtol=0, atol=1e-8)
+
+@pytest.mark.parametrize("seed", range(4))
+def test_personalized_pagerank_matches_closed_form(seed):
+    graph, d = random_graph(seed), 0.85
+    n = len(graph)
+    seeds = ["n0", ["n1", "n2", "n2"], ["n24", "missing"], ["missing"], []]
+    R = graph.personalized_pagerank(seeds, damping=d)
+    assert R.shape == (n, len(seeds))
+    W, dangling = dense_transition(graph, ("calls",))
+    for j, group in enumerate(seeds[:3]):
+        members = [group] if isinstance(group, str) else group
+        rows = [graph.index[i] for i in members if i in graph.index]
+        s = np.zeros(n)
+        np.add.at(s, rows, 1.0 / len(rows))
+        # r = (1 - d) (I - d (W + s danglingᵀ))⁻¹ s: teleports and dangling mass return to the seeds
+        expected = (1 - d) * np.linalg.solve(np.eye(n) - d * (W + np.outer(s, dangling)), s)
+        np.testing.assert_allclose(R[:, j], expected, rtol=0, atol=1e-8)
+        assert R[:, j].sum() == pytest.approx(1.0)
+    # seed sets with no node in the graph give zero columns
+    assert not R[:, 3:].any()
+
+def test_empty_graph():
+    graph = CallGraph.from_edges([])
+    assert graph.pagerank().shape == (0,)
+    assert graph.personalized_pagerank(["x"]).shape == (0, 1)
+
+def test_category_seeds_keep_groups_with_the_same_label(tmp_path):
+    gi = GraphIndex.open(DATA / "analysis.json", path=tmp_path / "g", code_path=None)
+    seeds = category_seeds(gi, "c2Subcategories")
+    assert len(seeds) == sum(1 for _ in gi.categories("c2Subcategories")) == 25
+    shared = sorted(name for name in seeds if name.startswith("OpenAPI Schema Generation"))
+    assert [len(seeds[name]) for name in shared] == [2, 1]
+    assert len(SeedRelevance(CallGraph.from_index(gi), seeds).columns()) == 25
+
+def test_seed_columns_are_unique():
+    graph = CallGraph.from_edges([{"source": "a", "target": "b", "label": "call"}])
+    rel = SeedRelevance(graph, {"A & B": ["a"], "A B": ["b"], "a-b": ["a", "b"]})
+    cols = rel.columns()
+    assert list(cols) == ["ppr_a_b", "ppr_a_b_2", "ppr_a_b_3"]
+    np.testing.assert_array_equal(cols["ppr_a_b_2"], rel.matrix[:, 1])
@@ -0,0 +1,78 @@
+import random
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from graph import CallGraph
+from graph_index import GraphIndex
+
+DATA = Path(__file__).resolve().parent.parent / "core" / "data"
+
+KEYS = ("count", "sum", "max", "mean", "weighted")
+
+def brute_force(ids, parent_of, values, weights):
+    """Walk every subtree on its own and aggregate the non-NaN values in it."""
+    children = {}
+    for child, parent in parent_of.items():
+        children.setdefault(parent, []).append(child)
+    out = {key: [] for key in KEYS}
+    for root in ids:
+        stack, vals, ws = [root], [], []
+        while stack:
+            node = stack.pop()
+            stack.extend(children.get(node, ()))
+            if not np.isnan(values[node]):
+                vals.append(values[node])
+                ws.append(weights[node])
+        out["count"].append(len(vals))
+        out["sum"].append(sum(vals))
+        out["max"].append(max(vals) if vals else np.nan)
+        out["mean"].append(sum(vals) / len(vals) if vals else np.nan)
+        out["weighted"].append(sum(v * w for v, w in zip(vals, ws)) / sum(ws) if sum(ws) > 0 else np.nan)
+    return {key: np.array(v, dtype=np.float64) for key, v in out.items()}
+
+def assert_rollup(graph, parent_of, values, weights):
+    got = graph.rollup([values[i] for i in graph.ids], [weights[i] for i in graph.ids])
+    expected = brute_force(graph.ids, parent_of, values, weights)
+    for key in KEYS:
+        np.testing.assert_allclose(got[key], expected[key], rtol=1e-12, atol=1e-12, equal_nan=True, err_msg=key)
+
+def random_forest(rng, n):
+    """Edges of a random forest (unlabeled contains edges, plus call noise) and its parent map."""
+    ids = [f"code:f{i}.py:s{i}:{i}" for i in range(n)]
+    parent_of = {ids[i]: ids[rng.randrange(i)] for i in range(1, n) if rng.random() < 0.85}
+    edges = [{"source": p, "target": c} for c, p in parent_of.items()]
+    edges += [{"source": rng.choice(ids), "target": rng.choice(ids), "label": "call"} for _ in range(n)]
+    rng.shuffle(edges)
+    return ids, parent_of, edges
+
+@pytest.mark.parametrize("seed", range(5))
+def test_rollup_matches_brute_force(seed):
+    rng = random.Random(seed)
+    ids, parent_of, edges = random_forest(rng, 60)
+    values = {i: np.nan if rng.random() < 0.3 else rng.uniform(-1, 5) for i in ids}
+    weights = {i: float(rng.randrange(4)) for i in ids}
+    assert_rollup(CallGraph.from_edges(edges, ids), parent_of, values, weights)
+
+def test_rollup_without_weights_is_the_mean():
+    edges = [{"source": "a", "target": "b"}, {"source": "a", "target": "c"}, {"source": "c", "target": "d"}]
+    agg = CallGraph.from_edges(edges, "abcd").rollup([np.nan, 1.0, 2.0, 6.0])
+    np.testing.assert_array_equal(agg["count"], [3, 1, 2, 1])
+    np.testing.assert_array_equal(agg["weighted"], agg["mean"])
+    assert agg["max"][0] == 6.0 and agg["mean"][0] == 3.0
+
+def test_containment_cycle_raises():
+    edges = [{"source": "a", "target": "b"}, {"source": "b", "target": "a"}]
+    with pytest.raises(ValueError):
+        CallGraph.from_edges(edges).containment()
+
+def test_rollup_matches_brute_force_on_sample(tmp_path):
+    graph = CallGraph.from_index(GraphIndex.open(DATA / "analysis.json", path=tmp_path / "g", code_path=None))
+    parent, _ = graph.containment()
+    parent_of = {graph.ids[k]: graph.ids[p] for k, p in enumerate(parent) if p >= 0}
+    rng = random.Random(0)
+    values = {i: rng.random() if i.startswith("code:") else np.nan for i in graph.ids}
+    weights = {i: float(rng.randrange(1, 50)) for i in graph.ids}
+    assert len(parent_of) > 100
+    assert_rollup(graph, parent_of, values, weights)
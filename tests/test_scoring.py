@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+import rank_func
+from rank_func import FEATURE_COLS, critical_mask, feature_matrix, is_critical
+
+LABELS = ["__init__", "get", "setup_app", "", None, float("nan"), "get", "mount"]
+IDS = ["code:fastapi/routing.py:get:10", "code:fastapi/utils.py:routing:3", "file:fastapi/models.py",
+       "code:a.py:f:1", None, "code:fastapi/schemas.py:x:2", "code:fastapi/utils.py:get:8", "weird"]
+
+@pytest.mark.parametrize("pandas_ok", [True, False])
+def test_critical_mask_matches_is_critical(monkeypatch, pandas_ok):
+    monkeypatch.setattr(rank_func, "PANDAS_OK", pandas_ok and rank_func.PANDAS_OK)
+    expected = [bool(is_critical(l, i)) for l, i in zip(LABELS, IDS)]
+    assert critical_mask(LABELS, IDS).tolist() == expected
+    assert expected == [True, False, True, False, False, True, False, True]
+
+def test_file_rule_ignores_symbol_names():
+    # "routing" as a symbol of utils.py is not a critical file
+    assert not is_critical("", "code:fastapi/utils.py:routing:3")
+    assert is_critical("", "code:fastapi/routing.py:f:3")
+
+def test_feature_matrix_fills_missing_features():
+    full = {c: k for k, c in enumerate(FEATURE_COLS)}
+    partial = {"loc": 7, "one_liner": True}
+    np.testing.assert_array_equal(feature_matrix([full]), [list(range(len(FEATURE_COLS)))])
+    X = feature_matrix([full, partial])
+    assert X.shape == (2, len(FEATURE_COLS))
+    assert X[1, FEATURE_COLS.index("loc")] == 7 and X[1].sum() == 8
+
+def test_score_accepts_rows_and_matrices_of_any_container():
+    ranker = rank_func.FunctionRanker()
+    rows = [{c: (k + j) % 5 for k, c in enumerate(FEATURE_COLS)} | {"id": f"code:a.py:f{j}:{j}", "label": f"f{j}"}
+            for j in range(4)]
+    X = feature_matrix(rows)
+    labels, ids = [r["label"] for r in rows], [r["id"] for r in rows]
+    expected = ranker.score(X, labels, ids)
+    np.testing.assert_allclose(ranker.score(X.tolist(), labels, ids), expected)
+    np.testing.assert_allclose(ranker.score((list(x) for x in X), labels, ids), expected)
+    np.testing.assert_allclose(ranker.score(r for r in rows), expected, atol=1e-4)
+    assert "triviality" in rows[0]
+    assert len(ranker.score(np.zeros((0, len(FEATURE_COLS))))) == 0
+    assert len(ranker.score([])) == 0
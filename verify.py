@@ -1,8 +1,9 @@
-import json
 import csv
 from pathlib import Path
 import sys
 
+from loader import iter_graph_nodes, iter_json_items
+
 ROOT = Path(".")
 IN_JSON = ROOT / "core" / "data" / "analysis-with-code.json"
 OUT_JSON = ROOT / "core" / "data" / "ranked_functions.json"
@@ -10,20 +11,12 @@ OUT_CSV = ROOT / "core" / "data" / "ranked_functions_scores.csv"
 REPORT = ROOT / "core" / "data" / "preservation_report.txt"
 
 def load_input_ids():
-    with IN_JSON.open("r", encoding="utf-8") as f:
-        j = json.load(f)
-    nodes = j.get("analysisData", {}).get("graphNodes", [])
-    ids = [n.get("id") for n in nodes]
-    return ids
+    return [n.get("id") for n in iter_graph_nodes(IN_JSON)]
 
 def load_out_json_ids():
     if not OUT_JSON.exists():
         return []
-    with OUT_JSON.open("r", encoding="utf-8") as f:
-        j = json.load(f)
-    rows = j.get("function_rankings", [])
-    ids = [r.get("id") for r in rows]
-    return ids
+    return [r.get("id") for r in iter_json_items(OUT_JSON, ("function_rankings",))]
 
 def load_csv_ids():
     if not OUT_CSV.exists():